@@ -5,7 +5,6 @@ sys.path.append('src')
 
 from integrated_engine import TripXIntegratedEngine
 import plotly.graph_objects as go
-import time
 
 def apply_simple_theme():
     st.markdown("""
@@ -45,19 +44,25 @@ def apply_simple_theme():
 
 
 def initialize_session_state():
-    if 'engine' not in st.session_state:
-        st.session_state.engine = None
     if 'recommendations' not in st.session_state:
         st.session_state.recommendations = None
     if 'user_preferences' not in st.session_state:
         st.session_state.user_preferences = None
+    if 'enhancement_request' not in st.session_state:
+        st.session_state.enhancement_request = None
+
+
+@st.cache_resource(show_spinner="Loading TripX AI Engine...")
+def get_shared_engine():
+    # Built once per process and shared by every session; sessions only keep their own results.
+    # LLM batching stays off: it holds every destination until the one combined generation ends
+    return TripXIntegratedEngine("groq")
 
 
 def load_engine():
-    if st.session_state.engine is None:
-        with st.spinner("Loading TripX AI Engine..."):
-            st.session_state.engine = TripXIntegratedEngine("groq")
-    return st.session_state.engine
+    engine = get_shared_engine()
+    engine.reload_if_changed()
+    return engine
 
 
 def create_score_chart(recommendations):
@@ -126,6 +131,67 @@ def create_cost_comparison(recommendations):
     return fig
 
 
+def render_recommendation(i, rec, prefs, itinerary_so_far=""):
+    # Returns the slot a pending itinerary streams into, None once the recommendation is complete
+    ml_rec = rec['ml_recommendation']
+    pending = rec['enhancement_status'] == 'pending'
+    
+    with st.expander(f"#{i} - {ml_rec['destination']}, {ml_rec['country']} (Score: {rec['ml_score']:.3f})",
+                     expanded=i == 1):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("ML Score", f"{rec['ml_score']:.3f}")
+        
+        with col2:
+            st.metric("Daily Cost", f"${ml_rec['cost_per_day']}")
+        
+        with col3:
+            st.metric("Duration", ml_rec['duration_range'])
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.write("**Travel Type:**", ml_rec['trip_type'].title())
+            st.write("**Region:**", ml_rec['region'])
+            st.write("**Current Weather:**", "Loading..." if pending else f"{rec['weather_info'].get('current_temp', 'N/A')}°C")
+            
+            st.write("**Machine Learning Analysis:**")
+            ml_reasoning = rec.get('ml_reasoning', '') or ''
+            st.write(ml_reasoning if ml_reasoning else "ML analysis not available.")
+            
+            st.write("**Key Attractions:**")
+            attractions = rec.get('attractions', []) or []
+            if pending:
+                st.write("Finding attractions...")
+            for j, attraction in enumerate(attractions[:3], 1):
+                st.write(f"{j}. **{attraction['name']}** ({attraction['category']})")
+        
+        with col2:
+            if pending:
+                st.write("**AI-Generated Insights:**")
+                st.write("Writing insights and itinerary...")
+                
+                st.write("**Travel Itinerary:**")
+                itinerary_slot = st.empty()
+                if itinerary_so_far:
+                    itinerary_slot.markdown(itinerary_so_far + "▌")
+                return itinerary_slot
+            
+            st.write("**AI-Generated Insights:**")
+            llm_explanation = rec.get('llm_explanation', '') or ''
+            st.write(llm_explanation if llm_explanation else "AI insights not available.")
+            
+            st.write("**Travel Itinerary Preview:**")
+            itinerary = rec.get('detailed_itinerary', '') or ''
+            itinerary_preview = itinerary[:300] + "..." if len(itinerary) > 300 else itinerary
+            st.write(itinerary_preview if itinerary_preview else "Itinerary information not available.")
+            
+            if itinerary and st.button("Show full itinerary", key=f"full_itinerary_{i}"):
+                st.markdown(itinerary)
+    
+    return None
+
 
 def main():
     st.set_page_config(
@@ -269,13 +335,11 @@ def main():
                 engine = load_engine()
                 
                 with st.spinner("Hold on, I'm thinking really hard about this..."):
-                    progress_bar = st.progress(0)
-                    for i in range(100):
-                        time.sleep(0.01)
-                        progress_bar.progress(i + 1)
-                    
-                    results = engine.get_enhanced_recommendations(user_preferences, top_n=num_recommendations)
-                    st.session_state.recommendations = results
+                    # Rank now, enrich in the background; the results page fills in details as they land
+                    request = engine.start_enhanced_recommendations(user_preferences, top_n=num_recommendations,
+                                                                    stream_itineraries=True)
+                    st.session_state.enhancement_request = request
+                    st.session_state.recommendations = request.snapshot()
                 
                 st.success("Ta-da! I found some amazing places for you!")
                 st.rerun()
@@ -320,6 +384,7 @@ def main():
         if st.button("← Back to Configuration"):
             st.session_state.recommendations = None
             st.session_state.user_preferences = None
+            st.session_state.enhancement_request = None
             st.rerun()
         
         if results['status'] == 'success':
@@ -349,47 +414,18 @@ def main():
             # Display recommendations
             st.divider()
             st.subheader("Your Personalized Recommendations")
+            recommendations_progress = st.empty()
             
+            # Details still being enriched are drawn into slots and filled in as they arrive
+            request = st.session_state.enhancement_request
+            recommendation_slots = []
+            itinerary_slots = {}
             for i, rec in enumerate(results['recommendations'], 1):
-                ml_rec = rec['ml_recommendation']
-                
-                with st.expander(f"#{i} - {ml_rec['destination']}, {ml_rec['country']} (Score: {rec['ml_score']:.3f})"):
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        st.metric("ML Score", f"{rec['ml_score']:.3f}")
-                    
-                    with col2:
-                        st.metric("Daily Cost", f"${ml_rec['cost_per_day']}")
-                    
-                    with col3:
-                        st.metric("Duration", ml_rec['duration_range'])
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.write("**Travel Type:**", ml_rec['trip_type'].title())
-                        st.write("**Region:**", ml_rec['region'])
-                        st.write("**Current Weather:**", f"{rec['weather_info'].get('current_temp', 'N/A')}°C")
-                        
-                        st.write("**Machine Learning Analysis:**")
-                        ml_reasoning = rec.get('ml_reasoning', '') or ''
-                        st.write(ml_reasoning if ml_reasoning else "ML analysis not available.")
-                        
-                        st.write("**Key Attractions:**")
-                        attractions = rec.get('attractions', []) or []
-                        for j, attraction in enumerate(attractions[:3], 1):
-                            st.write(f"{j}. **{attraction['name']}** ({attraction['category']})")
-                    
-                    with col2:
-                        st.write("**AI-Generated Insights:**")
-                        llm_explanation = rec.get('llm_explanation', '') or ''
-                        st.write(llm_explanation if llm_explanation else "AI insights not available.")
-                        
-                        st.write("**Travel Itinerary Preview:**")
-                        itinerary = rec.get('detailed_itinerary', '') or ''
-                        itinerary_preview = itinerary[:300] + "..." if len(itinerary) > 300 else itinerary
-                        st.write(itinerary_preview if itinerary_preview else "Itinerary information not available.")
+                slot = st.empty()
+                with slot.container():
+                    itinerary_so_far = request.partial_itinerary(i) if request is not None else ""
+                    itinerary_slots[i] = render_recommendation(i, rec, prefs, itinerary_so_far)
+                recommendation_slots.append(slot)
             
             # System info
             st.divider()
@@ -408,6 +444,41 @@ def main():
             
             with col4:
                 st.metric("Attractions API", "OpenTripMap")
+            
+            if request is not None:
+                pending_ranks = {rec['rank'] for rec in results['recommendations']
+                                 if rec['enhancement_status'] == 'pending'}
+                
+                # Progress follows the real stages: ML ranking, then weather, attractions,
+                # itinerary and explanation for every destination. Itineraries stream into
+                # their recommendation while they are written.
+                progress_bar = recommendations_progress.progress(request.progress(), text="Enriching recommendations...")
+                for event in request.updates():
+                    if event['stage'] == 'itinerary_chunk':
+                        itinerary_slot = itinerary_slots.get(event['rank'])
+                        if event['rank'] in pending_ranks and itinerary_slot is not None:
+                            itinerary_slot.markdown(request.partial_itinerary(event['rank']) + "▌")
+                        continue
+                    
+                    progress_bar.progress(event['completed'] / event['total'],
+                                          text=f"{event['stage'].replace('_', ' ').title()} done"
+                                               + (f" for {event['destination']}" if event['destination'] else ""))
+                    
+                    for rank in sorted(pending_ranks):
+                        future = request.futures[rank - 1]
+                        if future.done() and future.exception() is None:
+                            with recommendation_slots[rank - 1].container():
+                                render_recommendation(rank, future.result(), prefs)
+                            pending_ranks.discard(rank)
+                
+                for enhanced in request.as_completed():
+                    if enhanced['rank'] in pending_ranks:
+                        with recommendation_slots[enhanced['rank'] - 1].container():
+                            render_recommendation(enhanced['rank'], enhanced, prefs)
+                
+                recommendations_progress.empty()
+                st.session_state.recommendations = request.result()
+                st.session_state.enhancement_request = None
         
         else:
             st.error("No Recommendations Found")
@@ -0,0 +1,359 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live per entry.
+
+    Keeps hit and miss counters so callers can report how well it is working.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or self._is_expired(entry):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_size': self.max_size
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _is_expired(self, entry) -> bool:
+        return self.ttl is not None and time.monotonic() - entry[1] > self.ttl
+
+
+class StaleWhileRevalidateCache:
+    """
+    Async cache that keeps serving an expired entry while it is refreshed in the background.
+
+    Entries are fresh for ttl seconds, then stale for another stale_ttl seconds: a stale
+    read returns immediately and schedules one refresh. Fetches that return None are
+    treated as failures and never replace what is cached. Concurrent misses for the same
+    key on the same event loop share a single fetch.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_size: int = 2048):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.fetches = 0
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            age = now - entry[1] if entry is not None else None
+
+            if entry is not None and age <= self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                if age <= self.ttl:
+                    self.hits += 1
+                    return entry[0]
+                self.stale_hits += 1
+                stale_value = entry[0]
+            else:
+                self.misses += 1
+                stale_value = None
+
+        task = self._fetch_once(key, fetch)
+
+        if stale_value is not None:
+            return stale_value
+
+        return await task
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'fetches': self.fetches,
+                'hit_rate': (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+                'size': len(self._entries)
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _fetch_once(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        # A task can only be awaited from its own loop, so fetches are shared per event loop
+        in_flight_key = (asyncio.get_running_loop(), key)
+
+        with self._lock:
+            task = self._in_flight.get(in_flight_key)
+            if task is not None:
+                return task
+
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            self._in_flight[in_flight_key] = task
+
+        def forget(done: asyncio.Task):
+            with self._lock:
+                if self._in_flight.get(in_flight_key) is done:
+                    del self._in_flight[in_flight_key]
+
+        task.add_done_callback(forget)
+        return task
+
+    async def _fetch_and_store(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+
+        if value is not None:
+            with self._lock:
+                self.fetches += 1
+                self._entries[key] = (value, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        return value
+
+
+class PersistentCache:
+    """
+    Two-tier string cache: an in-memory TTLCache in front of a SQLite file.
+
+    The disk tier survives restarts. Both tiers expire entries after ttl seconds, and
+    the disk tier drops its least recently used rows once it holds more than
+    max_disk_entries. If the file can't be opened the cache runs memory-only.
+
+    Coroutines use aget/aset, which run disk work on the cache's own single thread so
+    SQLite reads and commits never block the event loop. Access times of disk hits are
+    buffered and written with the next commit rather than committed per read.
+    """
+
+    def __init__(self, path: str, max_memory_entries: int = 1024, max_disk_entries: int = 50000,
+                 ttl: Optional[float] = 7 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+
+        self.memory = TTLCache(max_size=max_memory_entries, ttl=ttl)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._pending_access = {}
+        self._connection = self._open(path)
+        self._disk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tripx-cache-disk')
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return value
+
+        return self._finish_get(key, self._disk_get(key))
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get for coroutines: a memory miss reads the disk tier off the event loop."""
+        value = self.memory.get(key)
+        if value is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return value
+
+        if self._connection is None:
+            return self._finish_get(key, None)
+
+        value = await asyncio.get_running_loop().run_in_executor(self._disk_executor, self._disk_get, key)
+        return self._finish_get(key, value)
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        self._disk_set(key, value)
+
+    async def aset(self, key: str, value: str):
+        """set for coroutines: the memory tier is updated at once, the disk write off the event loop."""
+        self.memory.set(key, value)
+
+        if self._connection is not None:
+            await asyncio.get_running_loop().run_in_executor(self._disk_executor, self._disk_set, key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self._connection is not None:
+            with self._lock:
+                self._pending_access.clear()
+                self._connection.execute("DELETE FROM cache")
+                self._connection.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = None
+            if self._connection is not None:
+                disk_entries = self._connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory),
+                'disk_entries': disk_entries
+            }
+
+    def _open(self, path: str) -> Optional[sqlite3.Connection]:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            connection = sqlite3.connect(path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # With WAL, NORMAL only syncs at checkpoints; a power loss can drop recent entries, never corrupt
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.commit()
+            return connection
+        except (OSError, sqlite3.Error) as e:
+            print(f"Response cache at {path} unavailable ({e}); using memory only")
+            return None
+
+    def _finish_get(self, key: str, value: Optional[str]) -> Optional[str]:
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+
+        self.memory.set(key, value)
+        return value
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        if self._connection is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._connection.execute(
+                    "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is None:
+                    return None
+
+                if self.ttl is not None and now - row[1] > self.ttl:
+                    self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._connection.commit()
+                    return None
+
+                # Written with the next commit; a crash only loses some LRU ordering
+                self._pending_access[key] = now
+                if len(self._pending_access) >= 100:
+                    self._flush_access_times()
+                    self._connection.commit()
+                return row[0]
+            except sqlite3.Error:
+                return None
+
+    def _disk_set(self, key: str, value: str):
+        if self._connection is None:
+            return
+
+        now = time.time()
+        with self._lock:
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._pending_access.pop(key, None)
+                self._flush_access_times()
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= 100:
+                    self._prune(now)
+                self._connection.commit()
+            except sqlite3.Error:
+                pass
+
+    def _flush_access_times(self):
+        # Caller holds the lock and commits
+        if self._pending_access:
+            self._connection.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def _prune(self, now: float):
+        # Caller holds the lock
+        self._writes_since_prune = 0
+
+        if self.ttl is not None:
+            self._connection.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl,))
+
+        count = self._connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self.max_disk_entries:
+            self._connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
@@ -0,0 +1,352 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from snapshot import current_snapshot_dir, file_digest, publish_snapshot, staging_dir
+
+
+GAZETTEER_FORMAT_VERSION = 1
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+GAZETTEER_SOURCE_DIR = os.path.join(DATA_DIR, 'geo')
+GAZETTEER_FILES = ('cities.csv', 'countries.csv')
+KEY_SEPARATOR = '|'
+
+# Spelling variants folded together before matching, so "St. Lucia" meets "Saint Lucia"
+WORD_ALIASES = {'saint': 'st', 'sainte': 'ste', 'mount': 'mt'}
+
+# Every character normalize_place can produce
+PLACE_CHARACTERS = 'abcdefghijklmnopqrstuvwxyz0123456789 '
+
+
+# Every precision Gazetteer.resolve reports
+GEO_PRECISIONS = ('city', 'fuzzy', 'country', 'none')
+
+
+class GeoMatch(NamedTuple):
+    latitude: float
+    longitude: float
+    precision: str  # 'city', 'fuzzy' (closest city name in the country) or 'country' (centroid)
+
+
+def normalize_place(name) -> str:
+    """Lowercase ASCII words of a place name with accents, punctuation and apostrophes dropped."""
+    text = str(name)
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    text = text.lower()
+    words = re.findall(r'[a-z0-9]+', text.replace("'", ''))
+    return ' '.join(WORD_ALIASES.get(word, word) for word in words)
+
+
+def character_counts(names: np.ndarray) -> np.ndarray:
+    """Count of each PLACE_CHARACTERS character in each normalized name, one row per name."""
+    names = np.asarray(names, dtype=str)
+    width = max(names.dtype.itemsize // 4, 1)
+    codes = np.ascontiguousarray(names, dtype=f'<U{width}').view(np.uint32).reshape(len(names), width)
+
+    # Padding (and anything unexpected) counts into one extra column that is dropped
+    symbols = len(PLACE_CHARACTERS) + 1
+    lookup = np.full(128, symbols - 1, dtype=np.int64)
+    lookup[[ord(character) for character in PLACE_CHARACTERS]] = np.arange(symbols - 1)
+    flat = lookup[np.minimum(codes, 127)] + np.arange(len(names))[:, None] * symbols
+
+    counts = np.bincount(flat.ravel(), minlength=len(names) * symbols).reshape(len(names), symbols)
+    return counts[:, :-1].astype(np.int16)
+
+
+def gazetteer_digest(source_dir: str) -> str:
+    digest = hashlib.sha256(str(GAZETTEER_FORMAT_VERSION).encode('utf-8'))
+    for name in GAZETTEER_FILES:
+        digest.update(file_digest(os.path.join(source_dir, name)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _split_aliases(value) -> List[str]:
+    return [alias.strip() for alias in str(value).split(';') if alias.strip()] if pd.notna(value) else []
+
+
+def compile_gazetteer(source_dir: str, output_dir: str, digest: str):
+    """
+    Compile the gazetteer CSVs in source_dir into sorted .npy arrays, published as the
+    current version of the compiled gazetteer at output_dir.
+
+    Cities are keyed by "country|city" on normalized names, with one entry per alias,
+    so an exact lookup is a binary search and a country's cities are one contiguous
+    run. Country names and aliases map to the canonical name cities are keyed under.
+    """
+    countries = pd.read_csv(os.path.join(source_dir, 'countries.csv'))
+    cities = pd.read_csv(os.path.join(source_dir, 'cities.csv'))
+
+    country_entries = {}
+    for row in countries.itertuples(index=False):
+        canonical = normalize_place(row.country)
+        for name in [row.country] + _split_aliases(row.aliases):
+            country_entries.setdefault(normalize_place(name), (canonical, row.latitude, row.longitude))
+
+    city_entries = {}
+    for row in cities.itertuples(index=False):
+        country = normalize_place(row.country)
+        if country not in country_entries:
+            raise ValueError(f"City {row.city!r} references unknown country {row.country!r}")
+        country = country_entries[country][0]
+        for name in [row.city] + _split_aliases(row.aliases):
+            city_entries.setdefault(f"{country}{KEY_SEPARATOR}{normalize_place(name)}", (row.latitude, row.longitude))
+
+    country_keys = sorted(country_entries)
+    city_keys = sorted(city_entries)
+
+    staging = staging_dir(output_dir)
+
+    np.save(os.path.join(staging, 'country_keys.npy'), np.array(country_keys, dtype=str))
+    np.save(os.path.join(staging, 'country_names.npy'),
+            np.array([country_entries[key][0] for key in country_keys], dtype=str))
+    np.save(os.path.join(staging, 'country_coords.npy'),
+            np.array([country_entries[key][1:] for key in country_keys], dtype=np.float64).reshape(-1, 2))
+    np.save(os.path.join(staging, 'city_keys.npy'), np.array(city_keys, dtype=str))
+    np.save(os.path.join(staging, 'city_coords.npy'),
+            np.array([city_entries[key] for key in city_keys], dtype=np.float64).reshape(-1, 2))
+
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump({'format_version': GAZETTEER_FORMAT_VERSION, 'digest': digest,
+                   'countries': len(country_keys), 'cities': len(city_keys)}, f, indent=2)
+
+    publish_snapshot(staging, output_dir)
+
+
+class Gazetteer:
+    """
+    Offline place lookup over a compiled gazetteer.
+
+    lookup() tries, in order: the exact city within the country, the closest city name
+    within the country (difflib, for variant spellings), and the country's centroid.
+    Country names themselves are matched exactly, then fuzzily.
+    """
+
+    def __init__(self, directory: str, digest: str, fuzzy_cutoff: float = 0.85):
+        self.directory = directory
+        self.digest = digest
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self.country_keys = self._load('country_keys')
+        self.country_names = self._load('country_names')
+        self.country_coords = self._load('country_coords')
+        self.city_keys = self._load('city_keys')
+        self.city_coords = self._load('city_coords')
+
+        self._country_list = None
+        self._country_cities = {}
+        self._city_counts = None
+
+    def __len__(self) -> int:
+        return len(self.city_keys)
+
+    def lookup(self, destination: str, country: str) -> Optional[GeoMatch]:
+        country_position = self._find_country(normalize_place(country))
+        if country_position is None:
+            return None
+
+        canonical = str(self.country_names[country_position])
+        city = normalize_place(destination)
+
+        position = self._exact(self.city_keys, f"{canonical}{KEY_SEPARATOR}{city}")
+        if position is None:
+            position = self._closest_city(canonical, city)
+            if position is None:
+                return GeoMatch(*self.country_coords[country_position].tolist(), 'country')
+            return GeoMatch(*self.city_coords[position].tolist(), 'fuzzy')
+
+        return GeoMatch(*self.city_coords[position].tolist(), 'city')
+
+    def resolve(self, destinations: pd.Series, countries: pd.Series,
+                fuzzy: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Latitude, longitude and match precision arrays for paired columns.
+
+        Exact city matches are found with one binary search over every key at once; only
+        the misses are matched fuzzily, and with fuzzy=False not at all, since on feeds
+        with many unknown names fuzzy matching costs far more than everything else. A
+        country centroid is no place to fetch weather for, so rows matched only to their
+        country get NaN coordinates and precision 'country', and rows matching nothing
+        get NaN and 'none'.
+        """
+        # Work on distinct names and distinct (destination, country) pairs; missing names factorize to -1
+        destination_codes, destination_names = pd.factorize(destinations)
+        country_codes, country_names = pd.factorize(countries)
+        stride = len(country_names) + 1
+        pairs, inverse = np.unique((destination_codes.astype(np.int64) + 1) * stride + (country_codes + 1),
+                                   return_inverse=True)
+        pair_destinations, pair_countries = np.divmod(pairs, stride)
+        pair_destinations -= 1
+        pair_countries -= 1
+
+        country_positions = [self._find_country(normalize_place(name)) for name in country_names]
+        canonical_countries = np.array(['' if position is None else str(self.country_names[position])
+                                        for position in country_positions] + [''], dtype=str)
+        country_known = np.array([position is not None for position in country_positions] + [False])
+        city_names = np.array([normalize_place(name) for name in destination_names] + [''], dtype=str)
+
+        # Index -1 (a missing name) lands on the trailing '' / False entries
+        known = country_known[pair_countries] & (pair_destinations >= 0)
+        coords = np.full((len(pairs), 2), np.nan)
+        precision = np.full(len(pairs), 'none', dtype=object)
+        precision[known] = 'country'
+
+        candidates = np.flatnonzero(known)
+        countries_of = canonical_countries[pair_countries[candidates]]
+        cities_of = city_names[pair_destinations[candidates]]
+        keys = np.char.add(np.char.add(countries_of, KEY_SEPARATOR), cities_of)
+
+        found = np.zeros(len(keys), dtype=bool)
+        if len(self.city_keys) and len(keys):
+            positions = np.searchsorted(self.city_keys, keys)
+            clipped = np.minimum(positions, len(self.city_keys) - 1)
+            found = (positions < len(self.city_keys)) & (self.city_keys[clipped] == keys)
+            coords[candidates[found]] = self.city_coords[clipped[found]]
+            precision[candidates[found]] = 'city'
+
+        if fuzzy:
+            misses = np.flatnonzero(~found)
+            positions = self._closest_cities(countries_of[misses], cities_of[misses])
+            close = positions >= 0
+            coords[candidates[misses[close]]] = self.city_coords[positions[close]]
+            precision[candidates[misses[close]]] = 'fuzzy'
+
+        inverse = inverse.reshape(-1)
+        resolved = coords[inverse]
+        return resolved[:, 0], resolved[:, 1], precision[inverse]
+
+    def _closest_city(self, canonical: str, city: str) -> Optional[int]:
+        """Position of the country's city whose name is closest to city, if any is close enough."""
+        start, names = self._cities_of(canonical)
+
+        # ratio() is at most 2 * shorter / total length, so names too far off in length never qualify
+        size = len(city)
+        near = [name for name in names if 2 * min(size, len(name)) >= self.fuzzy_cutoff * (size + len(name))]
+        if not near:
+            return None
+
+        close = difflib.get_close_matches(city, near, n=1, cutoff=self.fuzzy_cutoff)
+        return start + names.index(close[0]) if close else None
+
+    def _closest_cities(self, countries: np.ndarray, cities: np.ndarray, block_size: int = 100000) -> np.ndarray:
+        """
+        _closest_city for many (canonical country, city) pairs, -1 where nothing is close enough.
+
+        difflib's cheapest bound, 2 * shared characters / total length, is computed for every
+        candidate city with numpy first, so difflib only sees the few names that can pass.
+        """
+        positions = np.full(len(cities), -1, dtype=np.int64)
+        if len(cities) == 0 or len(self.city_keys) == 0:
+            return positions
+
+        if self._city_counts is None:
+            self._city_counts = character_counts(
+                np.array([str(key).split(KEY_SEPARATOR, 1)[1] for key in self.city_keys], dtype=str)
+            )
+
+        starts = np.searchsorted(self.city_keys, np.char.add(countries, KEY_SEPARATOR))
+        ends = np.searchsorted(self.city_keys, np.char.add(countries, chr(ord(KEY_SEPARATOR) + 1)))
+        query_counts = character_counts(cities)
+
+        # One row per (query, city of its country), taken a block of queries at a time
+        survivors = []
+        for block in range(0, len(cities), block_size):
+            sizes = ends[block:block + block_size] - starts[block:block + block_size]
+            queries = np.repeat(np.arange(block, block + len(sizes)), sizes)
+            offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            candidates = starts[queries] + offsets
+
+            shared = np.minimum(query_counts[queries], self._city_counts[candidates]).sum(axis=1)
+            total = query_counts[queries].sum(axis=1) + self._city_counts[candidates].sum(axis=1)
+            passing = 2.0 * shared / total >= self.fuzzy_cutoff
+            survivors.append((queries[passing], candidates[passing]))
+
+        # Queries come out in ascending order, so each one's survivors are a contiguous run
+        queries = np.concatenate([pair[0] for pair in survivors])
+        candidates = np.concatenate([pair[1] for pair in survivors])
+        unique_queries, run_starts = np.unique(queries, return_index=True)
+        for query, run in zip(unique_queries.tolist(), np.split(candidates, run_starts[1:])):
+            names = [str(self.city_keys[position]).split(KEY_SEPARATOR, 1)[1] for position in run.tolist()]
+            close = difflib.get_close_matches(str(cities[query]), names, n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                positions[query] = self._exact(self.city_keys, f"{countries[query]}{KEY_SEPARATOR}{close[0]}")
+
+        return positions
+
+    def _cities_of(self, canonical: str) -> Tuple[int, List[str]]:
+        cities = self._country_cities.get(canonical)
+        if cities is None:
+            # The country's cities are the keys between "country|" and "country}"
+            start = int(np.searchsorted(self.city_keys, f"{canonical}{KEY_SEPARATOR}"))
+            end = int(np.searchsorted(self.city_keys, f"{canonical}{chr(ord(KEY_SEPARATOR) + 1)}"))
+            cities = start, [str(key).split(KEY_SEPARATOR, 1)[1] for key in self.city_keys[start:end]]
+            self._country_cities[canonical] = cities
+        return cities
+
+    def _find_country(self, country: str) -> Optional[int]:
+        position = self._exact(self.country_keys, country)
+        if position is not None:
+            return position
+
+        if self._country_list is None:
+            self._country_list = [str(key) for key in self.country_keys]
+        close = difflib.get_close_matches(country, self._country_list, n=1, cutoff=self.fuzzy_cutoff)
+        return self._country_list.index(close[0]) if close else None
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r', allow_pickle=False)
+
+    def _exact(self, keys: np.ndarray, key: str) -> Optional[int]:
+        position = int(np.searchsorted(keys, key))
+        if position < len(keys) and keys[position] == key:
+            return position
+        return None
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def load_gazetteer(source_dir: str = GAZETTEER_SOURCE_DIR, compiled_dir: Optional[str] = None) -> Gazetteer:
+    """
+    Gazetteer for the CSVs in source_dir, compiled into compiled_dir (default
+    TRIPX_CACHE_DIR/gazetteer, else data/cache/gazetteer in the repository) the first time
+    and again whenever the CSVs change.
+    """
+    if compiled_dir is None:
+        compiled_dir = os.path.join(os.getenv('TRIPX_CACHE_DIR', os.path.join(DATA_DIR, 'cache')), 'gazetteer')
+
+    digest = gazetteer_digest(source_dir)
+
+    directory = current_snapshot_dir(compiled_dir)
+    try:
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            compiled = json.load(f).get('digest') == digest
+    except (OSError, TypeError, ValueError):
+        compiled = False
+
+    if not compiled:
+        print(f"Compiling gazetteer from {source_dir} into {compiled_dir}...")
+        compile_gazetteer(source_dir, compiled_dir, digest)
+        directory = current_snapshot_dir(compiled_dir)
+
+    return Gazetteer(directory, digest)
+
+
+def get_gazetteer() -> Gazetteer:
+    """Process-wide gazetteer, compiled and memory-mapped on first use."""
+    global _gazetteer
+
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = load_gazetteer(os.getenv('TRIPX_GEO_DIR', GAZETTEER_SOURCE_DIR))
+
+    return _gazetteer
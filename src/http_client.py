@@ -0,0 +1,155 @@
+import asyncio
+import os
+import queue
+import threading
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, Optional
+
+import httpx
+
+
+_background_loop = None
+_background_thread = None
+_loop_lock = threading.Lock()
+
+_shared_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Event loop on a daemon thread that runs every synchronous API call in the process."""
+    global _background_loop, _background_thread
+
+    with _loop_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='tripx-http-loop', daemon=True)
+            thread.start()
+            _background_loop, _background_thread = loop, thread
+
+    return _background_loop
+
+
+def run_sync(coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the background loop and block the calling thread for its result."""
+    loop = get_background_loop()
+
+    if threading.current_thread() is _background_thread:
+        raise RuntimeError("run_sync called from the background loop; await the coroutine instead")
+
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result(timeout)
+
+
+def iterate_sync(async_iterator: AsyncIterator) -> Iterator:
+    """Consume an async iterator on the background loop, yielding its items to the calling thread."""
+    loop = get_background_loop()
+    items = queue.Queue()
+    finished = object()
+
+    async def pump():
+        try:
+            async for item in async_iterator:
+                items.put((item, None))
+        except Exception as e:
+            items.put((finished, e))
+        else:
+            items.put((finished, None))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+
+    try:
+        while True:
+            item, error = items.get()
+            if item is finished:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # Stops the upstream request if the caller abandons the stream early
+        future.cancel()
+
+
+class HTTPConnectionPool:
+    """
+    Process-wide keep-alive connection pool shared by all outbound API calls.
+
+    httpx clients are bound to the event loop they were first used on, so one pooled
+    client is kept per loop (in practice just the background loop). Every request is
+    traced so reuse can be checked per host with connection_stats().
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+
+        self._clients = weakref.WeakKeyDictionary()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def client(self) -> httpx.AsyncClient:
+        """Pooled client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+
+        if client is None:
+            client = httpx.AsyncClient(limits=self.limits, event_hooks={'request': [self._trace_request]})
+            self._clients[loop] = client
+
+        return client
+
+    def connection_stats(self) -> Dict[str, Dict]:
+        """Per-host request, new-connection and reuse counts since the pool was created."""
+        with self._stats_lock:
+            stats = {}
+            for host, counts in self._stats.items():
+                reused = counts['requests'] - counts['new_connections']
+                stats[host] = dict(counts, reused_connections=reused,
+                                   reuse_rate=reused / counts['requests'] if counts['requests'] else 0.0)
+            return stats
+
+    async def _trace_request(self, request: httpx.Request):
+        host = request.url.host
+        self._count(host, 'requests')
+
+        async def trace(event_name: str, info: Dict):
+            if event_name == 'connection.connect_tcp.complete':
+                self._count(host, 'new_connections')
+            elif event_name == 'connection.start_tls.complete':
+                self._count(host, 'tls_handshakes')
+
+        request.extensions['trace'] = trace
+
+    def _count(self, host: str, counter: str):
+        with self._stats_lock:
+            counts = self._stats.setdefault(host, {'requests': 0, 'new_connections': 0, 'tls_handshakes': 0})
+            counts[counter] += 1
+
+
+def get_http_pool() -> HTTPConnectionPool:
+    """Shared pool, sized from TRIPX_HTTP_MAX_CONNECTIONS / TRIPX_HTTP_MAX_KEEPALIVE on first use."""
+    global _shared_pool
+
+    with _pool_lock:
+        if _shared_pool is None:
+            _shared_pool = HTTPConnectionPool(
+                max_connections=int(os.getenv('TRIPX_HTTP_MAX_CONNECTIONS', 100)),
+                max_keepalive_connections=int(os.getenv('TRIPX_HTTP_MAX_KEEPALIVE', 20))
+            )
+
+    return _shared_pool
+
+
+def configure_http_pool(max_connections: int = 100, max_keepalive_connections: int = 20,
+                        keepalive_expiry: float = 30.0) -> HTTPConnectionPool:
+    """Replace the shared pool with one of the given size; call before the first outbound request."""
+    global _shared_pool
+
+    with _pool_lock:
+        _shared_pool = HTTPConnectionPool(max_connections, max_keepalive_connections, keepalive_expiry)
+
+    return _shared_pool
@@ -1,9 +1,178 @@
-from typing import Dict, List, Optional
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Union
 from recsys import create_recommendation_engine
+from cache import TTLCache
 from llm_engine import TravelItineraryGenerator
+from http_client import get_background_loop
 import json
 
 
+ENRICHMENT_STAGES = ['weather', 'attractions', 'itinerary', 'explanation']
+
+
+def build_enhanced_recommendation(rank: int, ml_rec: Dict, itinerary_data: Optional[Dict] = None) -> Dict:
+    """Result entry for one destination; without itinerary_data it is a pending placeholder."""
+    itinerary_data = itinerary_data or {}
+    
+    return {
+        'ml_recommendation': ml_rec,
+        'ml_score': ml_rec['overall_score'],
+        'ml_reasoning': ml_rec['explanation'],
+        'detailed_itinerary': itinerary_data.get('daily_itinerary', ''),
+        'llm_explanation': itinerary_data.get('llm_explanation', ''),
+        'weather_info': itinerary_data.get('weather_context', {}),
+        'attractions': itinerary_data.get('top_attractions', []),
+        'rank': rank,
+        'enhancement_status': 'success' if itinerary_data else 'pending'
+    }
+
+
+class EnhancementRequest:
+    """
+    Handle for a staged enhanced-recommendation request.
+    
+    The ML ranking is available as soon as the handle exists. Enrichment for each
+    destination finishes independently and can be consumed as it arrives through
+    as_completed() or an on_result callback, inspected with snapshot(), or collected
+    with result(), which returns the same dict as get_enhanced_recommendations.
+    
+    Progress is reported as stage events (ml_ranking, then weather, attractions,
+    itinerary and explanation per destination) via stage_events() or on_stage.
+    
+    With stream_itineraries, each itinerary is also delivered while it is generated:
+    updates() interleaves 'itinerary_chunk' events with the stage events, and
+    partial_itinerary() returns the text received so far.
+    """
+    
+    def __init__(self, user_preferences: Dict, ml_recommendations: List[Dict], ml_engine_info: Dict,
+                 on_stage: Optional[Callable[[Dict], None]] = None, stream_itineraries: bool = False,
+                 top_n: Optional[int] = None):
+        self.user_preferences = user_preferences
+        self.top_n = top_n if top_n is not None else len(ml_recommendations)
+        self.ml_recommendations = ml_recommendations
+        self.ml_engine_info = ml_engine_info
+        self.futures = [Future() for _ in ml_recommendations]
+        self.stream_itineraries = stream_itineraries
+        self._itinerary_chunks = {}
+        
+        self.total_stages = 1 + len(ENRICHMENT_STAGES) * len(ml_recommendations)
+        self.completed_stages = 0
+        self.stage_durations = []
+        self._recorded_stages = set()
+        self._delivered_stages = 0
+        self._on_stage = on_stage
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+    
+    def done(self) -> bool:
+        return all(future.done() for future in self.futures)
+    
+    def progress(self) -> float:
+        return self.completed_stages / self.total_stages
+    
+    def record_stage(self, stage: str, duration: float, rank: Optional[int] = None, succeeded: bool = True):
+        """Record a finished stage; a (rank, stage) pair already recorded is ignored."""
+        with self._lock:
+            if (rank, stage) in self._recorded_stages:
+                return
+            self._recorded_stages.add((rank, stage))
+            self.completed_stages += 1
+            event = {
+                'stage': stage,
+                'rank': rank,
+                'destination': self.ml_recommendations[rank - 1]['destination'] if rank else None,
+                'duration': duration,
+                'succeeded': succeeded,
+                'completed': self.completed_stages,
+                'total': self.total_stages
+            }
+            self.stage_durations.append(event)
+        
+        print(f"   Stage {stage}" + (f" for {event['destination']}" if rank else "")
+              + f" took {duration:.3f}s" + ("" if succeeded else " (failed)"))
+        
+        self._events.put(event)
+        if self._on_stage is not None:
+            self._on_stage(event)
+    
+    def record_itinerary_chunk(self, rank: int, chunk: str):
+        with self._lock:
+            self._itinerary_chunks.setdefault(rank, []).append(chunk)
+        
+        self._events.put({
+            'stage': 'itinerary_chunk',
+            'rank': rank,
+            'destination': self.ml_recommendations[rank - 1]['destination'],
+            'chunk': chunk
+        })
+    
+    def partial_itinerary(self, rank: int) -> str:
+        """Itinerary text streamed so far for the destination at rank."""
+        with self._lock:
+            return ''.join(self._itinerary_chunks.get(rank, []))
+    
+    def skip_remaining_stages(self, rank: int):
+        """Record the stages a failed destination never reached, so progress still completes."""
+        for stage in ENRICHMENT_STAGES:
+            self.record_stage(stage, 0.0, rank, succeeded=False)
+    
+    def stage_events(self, timeout: Optional[float] = None) -> Iterator[Dict]:
+        """
+        Yield each stage event as it happens, until every stage of the request has finished.
+        
+        Events are handed out once; a later call picks up where the previous one stopped.
+        """
+        for event in self.updates(timeout):
+            if event['stage'] != 'itinerary_chunk':
+                yield event
+    
+    def updates(self, timeout: Optional[float] = None) -> Iterator[Dict]:
+        """Like stage_events, with the 'itinerary_chunk' events of streamed itineraries in between."""
+        while self._delivered_stages < self.total_stages:
+            event = self._events.get(timeout=timeout)
+            if event['stage'] != 'itinerary_chunk':
+                self._delivered_stages += 1
+            yield event
+    
+    def as_completed(self, timeout: Optional[float] = None) -> Iterator[Dict]:
+        """Yield enhanced recommendations in completion order; each carries its 'rank'."""
+        for future in as_completed(self.futures, timeout=timeout):
+            yield future.result()
+    
+    def snapshot(self) -> Dict:
+        """Current state, with destinations still being enriched marked 'pending'."""
+        recommendations = [
+            future.result() if future.done() and future.exception() is None
+            else build_enhanced_recommendation(rank, ml_rec)
+            for rank, (ml_rec, future) in enumerate(zip(self.ml_recommendations, self.futures), 1)
+        ]
+        return self._as_response(recommendations)
+    
+    def result(self, timeout: Optional[float] = None) -> Dict:
+        return self._as_response([future.result(timeout) for future in self.futures])
+    
+    def _as_response(self, recommendations: List[Dict]) -> Dict:
+        if not self.ml_recommendations:
+            return {
+                'status': 'no_recommendations',
+                'message': 'No destinations match your criteria',
+                'user_preferences': self.user_preferences
+            }
+        
+        return {
+            'status': 'success',
+            'user_preferences': self.user_preferences,
+            'total_recommendations': len(recommendations),
+            'recommendations': recommendations,
+            'ml_engine_info': self.ml_engine_info
+        }
+
+
 class TripXIntegratedEngine:
     """
     Combines ML recommendations with LLM text generation and API data.
@@ -12,19 +181,89 @@ class TripXIntegratedEngine:
     - ML System: Makes all travel decisions and recommendations
     - LLM Engine: Generates natural language text only
     - API Integration: Provides weather and attraction data
+    
+    One instance can be shared by every session in the process: the catalog is only
+    read while serving, and reload_if_changed() swaps in a freshly built one when the
+    data file is modified.
+    
+    snapshot_dir (default: the TRIPX_SNAPSHOT_DIR environment variable) enables the
+    binary catalog snapshot, so restarts skip preprocessing while the CSV is unchanged.
+    
+    With batch_llm_calls, one request's explanations share a single LLM generation and so
+    do its itineraries, instead of two generations per destination. That saves provider
+    calls but no destination resolves until the combined generations finish, so the first
+    result arrives roughly N times later; it suits bulk callers that wait for result(),
+    not interactive views that show each destination as it lands.
     """
     
-    def __init__(self, llm_provider: str = "groq"):
+    def __init__(self, llm_provider: str = "groq", concurrent_enrichment: bool = True, max_concurrency: int = 8,
+                 data_path: str = 'data/raw/dest.csv', snapshot_dir: Optional[str] = None,
+                 batch_llm_calls: bool = False):
         print("Loading ML recommendation engine...")
-        self.ml_engine, self.destinations_df = create_recommendation_engine('data/raw/dest.csv')
+        self.data_path = data_path
+        self.snapshot_dir = snapshot_dir if snapshot_dir is not None else os.getenv('TRIPX_SNAPSHOT_DIR')
+        self.data_mtime = os.path.getmtime(data_path)
+        self.ml_engine, self.destinations_df = create_recommendation_engine(data_path, snapshot_dir=self.snapshot_dir)
+        self._reload_lock = threading.Lock()
         
         print("Loading LLM and API integrations...")
-        self.itinerary_generator = TravelItineraryGenerator(llm_provider)
+        self.itinerary_generator = TravelItineraryGenerator(llm_provider, max_concurrency=max_concurrency)
+        
+        # Fan out weather, attractions and LLM calls for all recommendations at once
+        self.concurrent_enrichment = concurrent_enrichment
+        self.batch_llm_calls = batch_llm_calls
+        
+        # Largest request started recently per preferences, so a follow-up comparison reuses its enrichment
+        self.recent_requests = TTLCache(max_size=256, ttl=600)
         
         print("Integrated engine ready!")
         print(f"ML Engine: {len(self.destinations_df)} destinations loaded")
         print(f"LLM Provider: {llm_provider}")
     
+    def reload_if_changed(self) -> bool:
+        """Rebuild the ML catalog if the data file changed on disk; returns True if it was reloaded."""
+        try:
+            mtime = os.path.getmtime(self.data_path)
+        except OSError:
+            return False
+        
+        if mtime == self.data_mtime:
+            return False
+        
+        with self._reload_lock:
+            if mtime == self.data_mtime:
+                return False
+            
+            print(f"Data file {self.data_path} changed, reloading ML recommendation engine...")
+            try:
+                ml_engine, destinations_df = create_recommendation_engine(self.data_path, snapshot_dir=self.snapshot_dir)
+            except Exception as e:
+                # Keep serving the catalog we have; a half-written file is retried on the next check
+                print(f"Reload failed, keeping current catalog: {e}")
+                return False
+            
+            # Requests already running keep the engine they started with
+            self.ml_engine, self.destinations_df = ml_engine, destinations_df
+            self.data_mtime = mtime
+            self.recent_requests.clear()
+        
+        print(f"ML Engine: {len(destinations_df)} destinations loaded")
+        return True
+    
+    def upsert_destinations(self, destinations: List[Dict]) -> Dict:
+        """Insert or update catalog rows in place; see TripXRecommendationEngine.upsert_destinations."""
+        result = self.ml_engine.upsert_destinations(destinations)
+        self.destinations_df = self.ml_engine.df
+        self.recent_requests.clear()
+        return result
+    
+    def delete_destinations(self, keys: List[tuple]) -> Dict:
+        """Remove catalog rows by (destination, country)."""
+        result = self.ml_engine.delete_destinations(keys)
+        self.destinations_df = self.ml_engine.df
+        self.recent_requests.clear()
+        return result
+    
     def get_enhanced_recommendations(self, user_preferences: Dict, top_n: int = 3) -> Dict:
         """
         Get ML recommendations enhanced with LLM text and API data.
@@ -34,69 +273,152 @@ class TripXIntegratedEngine:
         2. LLM generates descriptions
         3. APIs provide weather and attraction data
         """
+        request = self.start_enhanced_recommendations(user_preferences, top_n=top_n)
+        
+        for ml_rec in request.ml_recommendations:
+            print(f"   Processing {ml_rec['destination']}...")
+        
+        return request.result()
+    
+    def start_enhanced_recommendations(self, user_preferences: Dict, top_n: int = 3,
+                                       on_result: Optional[Callable[[Dict], None]] = None,
+                                       on_stage: Optional[Callable[[Dict], None]] = None,
+                                       stream_itineraries: bool = False) -> EnhancementRequest:
+        """
+        Staged variant of get_enhanced_recommendations.
         
+        Ranks destinations synchronously and returns right away; weather, attractions,
+        itinerary and explanation are fetched in the background. on_result, if given, is
+        called with each enhanced recommendation as it completes, and on_stage with each
+        stage event (both from the background event loop thread, so they should only
+        hand the data off). stream_itineraries delivers each itinerary as it is generated
+        (see EnhancementRequest.updates); it has no effect with batch_llm_calls.
+        """
         print("Generating ML recommendations...")
-        user_profile = self.ml_engine.preprocessor.create_user_profile_features(
+        ranking_started = time.perf_counter()
+        ml_engine = self.ml_engine
+        user_profile = ml_engine.preprocessor.create_user_profile_features(
             budget=user_preferences['budget'],
             duration=user_preferences['duration'],
             trip_type=user_preferences['trip_type'],
             season=user_preferences['season']
         )
         
-        ml_recommendations = self.ml_engine.get_recommendations(user_profile, top_n=top_n)
+        ml_recommendations = ml_engine.get_recommendations(user_profile, top_n=top_n)
+        
+        request = EnhancementRequest(user_preferences, ml_recommendations, {
+            'total_destinations': len(ml_engine.df),
+            'scoring_algorithm': 'multi_factor_weighted',
+            'features_used': 27
+        }, on_stage=on_stage, stream_itineraries=stream_itineraries, top_n=top_n)
+        request.record_stage('ml_ranking', time.perf_counter() - ranking_started)
+        self._remember_request(request)
         
         if not ml_recommendations:
-            return {
-                'status': 'no_recommendations',
-                'message': 'No destinations match your criteria',
-                'user_preferences': user_preferences
-            }
+            return request
+        
+        if on_result is not None:
+            for future in request.futures:
+                future.add_done_callback(lambda f: f.exception() is None and on_result(f.result()))
         
         print("Enhancing with LLM and API data...")
-        enhanced_recommendations = []
+        asyncio.run_coroutine_threadsafe(self._aenrich(request), get_background_loop())
         
-        for i, ml_rec in enumerate(ml_recommendations):
-            print(f"   Processing {ml_rec['destination']}...")
-            
-            itinerary_data = self.itinerary_generator.generate_itinerary(
-                user_preferences, [ml_rec]
-            )
+        return request
+    
+    async def _aenrich(self, request: EnhancementRequest):
+        generator = self.itinerary_generator
+        user_preferences = request.user_preferences
+        
+        async def enrich(rank: int, ml_rec: Dict, future: Future, semaphore: asyncio.Semaphore):
+            def on_stage(stage: str, duration: float, succeeded: bool):
+                request.record_stage(stage, duration, rank, succeeded)
             
-            enhanced_rec = {
-                'ml_recommendation': ml_rec,
-                'ml_score': ml_rec['overall_score'],
-                'ml_reasoning': ml_rec['explanation'],
-                'detailed_itinerary': itinerary_data.get('daily_itinerary', ''),
-                'llm_explanation': itinerary_data.get('llm_explanation', ''),
-                'weather_info': itinerary_data.get('weather_context', {}),
-                'attractions': itinerary_data.get('top_attractions', []),
-                'rank': i + 1,
-                'enhancement_status': 'success'
-            }
+            on_itinerary_chunk = None
+            if request.stream_itineraries:
+                on_itinerary_chunk = lambda chunk: request.record_itinerary_chunk(rank, chunk)
             
-            enhanced_recommendations.append(enhanced_rec)
+            try:
+                itinerary_data = await generator.aenrich_destination(user_preferences, ml_rec, semaphore, on_stage,
+                                                                     on_itinerary_chunk)
+                future.set_result(build_enhanced_recommendation(rank, ml_rec, itinerary_data))
+            except Exception as e:
+                request.skip_remaining_stages(rank)
+                future.set_exception(e)
         
-        return {
-            'status': 'success',
-            'user_preferences': user_preferences,
-            'total_recommendations': len(enhanced_recommendations),
-            'recommendations': enhanced_recommendations,
-            'ml_engine_info': {
-                'total_destinations': len(self.destinations_df),
-                'scoring_algorithm': 'multi_factor_weighted',
-                'features_used': 27
-            }
-        }
+        jobs = list(zip(range(1, len(request.ml_recommendations) + 1), request.ml_recommendations, request.futures))
+        
+        if self.batch_llm_calls:
+            await self._aenrich_batched(request, jobs)
+        elif self.concurrent_enrichment:
+            # Fan out weather, attractions and LLM calls for all recommendations at once
+            semaphore = asyncio.Semaphore(generator.max_concurrency)
+            await asyncio.gather(*(enrich(rank, ml_rec, future, semaphore) for rank, ml_rec, future in jobs))
+        else:
+            # One call at a time, one destination after another
+            semaphore = asyncio.Semaphore(1)
+            for rank, ml_rec, future in jobs:
+                await enrich(rank, ml_rec, future, semaphore)
     
-    def generate_comparison_report(self, user_preferences: Dict) -> Dict:
-        """Generate comparison report of top destinations."""
+    async def _aenrich_batched(self, request: EnhancementRequest, jobs: List[tuple]):
+        generator = self.itinerary_generator
+        semaphore = asyncio.Semaphore(generator.max_concurrency if self.concurrent_enrichment else 1)
         
-        enhanced_data = self.get_enhanced_recommendations(user_preferences, top_n=3)
+        def on_stage(index: int, stage: str, duration: float, succeeded: bool):
+            request.record_stage(stage, duration, jobs[index][0], succeeded)
         
-        if enhanced_data['status'] != 'success':
-            return enhanced_data
+        try:
+            itineraries = await generator.aenrich_destinations_batched(
+                request.user_preferences, request.ml_recommendations, semaphore, on_stage
+            )
+        except Exception as e:
+            for rank, _, future in jobs:
+                request.skip_remaining_stages(rank)
+                future.set_exception(e)
+            return
         
-        recommendations = enhanced_data['recommendations']
+        for (rank, ml_rec, future), itinerary_data in zip(jobs, itineraries):
+            future.set_result(build_enhanced_recommendation(rank, ml_rec, itinerary_data))
+    
+    def generate_comparison_report(self, user_preferences: Dict,
+                                   enhanced: Optional[Union[Dict, EnhancementRequest]] = None,
+                                   top_n: int = 3) -> Dict:
+        """
+        Generate comparison report of top destinations.
+        
+        enhanced may be a result from get_enhanced_recommendations or a handle from
+        start_enhanced_recommendations for the same preferences. Without it, a request
+        started recently for these preferences with at least top_n destinations is
+        reused (its first top_n), and only then is a new one started. The comparison only needs the ML ranking, so its LLM call runs while
+        enrichment is still finishing.
+        """
+        if isinstance(enhanced, dict):
+            if enhanced['status'] != 'success':
+                return enhanced
+            recommendations = enhanced['recommendations'][:top_n]
+            ml_recommendations = [rec['ml_recommendation'] for rec in recommendations]
+            comparison = None
+        else:
+            request = enhanced or self._recent_request(user_preferences, top_n)
+            if request is None:
+                request = self.start_enhanced_recommendations(user_preferences, top_n=top_n)
+            
+            if not request.ml_recommendations:
+                return request.result()
+            
+            ml_recommendations = request.ml_recommendations[:top_n]
+            
+            comparison = None
+            if len(ml_recommendations) >= 2:
+                comparison = asyncio.run_coroutine_threadsafe(
+                    self.itinerary_generator.llm_engine.agenerate_text(
+                        self._comparison_prompt(user_preferences, ml_recommendations), max_tokens=400
+                    ),
+                    get_background_loop()
+                )
+            
+            # Only the compared destinations are waited for
+            recommendations = [future.result() for future in request.futures[:top_n]]
         
         if len(recommendations) < 2:
             return {
@@ -104,12 +426,28 @@ class TripXIntegratedEngine:
                 'message': 'Need at least 2 destinations for comparison'
             }
         
+        if comparison is not None:
+            comparison_text = comparison.result()
+        else:
+            comparison_text = self.itinerary_generator.llm_engine.generate_text(
+                self._comparison_prompt(user_preferences, ml_recommendations), max_tokens=400
+            )
+        
+        return {
+            'status': 'success',
+            'user_preferences': user_preferences,
+            'top_destinations': [rec['ml_recommendation']['destination'] for rec in recommendations],
+            'ml_scores': [rec['ml_score'] for rec in recommendations],
+            'comparison_analysis': comparison_text,
+            'detailed_recommendations': recommendations
+        }
     
+    def _comparison_prompt(self, user_preferences: Dict, ml_recommendations: List[Dict]) -> str:
         destinations_text = ""
-        for i, rec in enumerate(recommendations, 1):
-            destinations_text += f"{i}. {rec['ml_recommendation']['destination']} (Score: {rec['ml_score']:.3f})\n"
+        for i, ml_rec in enumerate(ml_recommendations, 1):
+            destinations_text += f"{i}. {ml_rec['destination']} (Score: {ml_rec['overall_score']:.3f})\n"
         
-        comparison_prompt = f"""Compare these top travel destinations for a traveler:
+        return f"""Compare these top travel destinations for a traveler:
 Budget: ${user_preferences['budget']}/day, Duration: {user_preferences['duration']} days
 Trip Type: {user_preferences['trip_type']}, Season: {user_preferences['season']}
 
@@ -117,19 +455,23 @@ Destinations:
 {destinations_text}
 
 Provide a brief comparison highlighting the unique strengths of each destination."""
-
-        comparison_text = self.itinerary_generator.llm_engine.generate_text(
-            comparison_prompt, max_tokens=400
-        )
-        
-        return {
-            'status': 'success',
-            'user_preferences': user_preferences,
-            'top_destinations': [rec['ml_recommendation']['destination'] for rec in recommendations],
-            'ml_scores': [rec['ml_score'] for rec in recommendations],
-            'comparison_analysis': comparison_text,
-            'detailed_recommendations': recommendations
-        }
+    
+    def _request_key(self, user_preferences: Dict) -> tuple:
+        return tuple(sorted(user_preferences.items()))
+    
+    def _remember_request(self, request: EnhancementRequest):
+        # A smaller request never displaces a larger one, whose results cover it
+        key = self._request_key(request.user_preferences)
+        current = self.recent_requests.get(key)
+        if current is None or current.top_n <= request.top_n:
+            self.recent_requests.set(key, request)
+    
+    def _recent_request(self, user_preferences: Dict, top_n: int) -> Optional[EnhancementRequest]:
+        """A recent request for these preferences whose ranking covers the first top_n destinations."""
+        request = self.recent_requests.get(self._request_key(user_preferences))
+        if request is not None and request.top_n >= top_n:
+            return request
+        return None
 
 
 def test_integrated_system():
@@ -1,20 +1,113 @@
-import requests
+import asyncio
+import copy
+import hashlib
 import json
-from typing import Dict, List, Optional
+import math
+import re
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 import os
 from datetime import datetime, timedelta
 
+from cache import PersistentCache, StaleWhileRevalidateCache
+from http_client import get_http_pool, iterate_sync, run_sync
+from mock_provider import MockProvider, get_mock_provider
+from resilience import CircuitOpenError, get_provider_health
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+# Provider calls in flight, by response cache key, so identical prompts share one call
+_in_flight_generations = {}
+
+# Header line that opens each destination's section in a multi-destination prompt
+SECTION_HEADER = re.compile(r'^\s*#{1,4}\s*(\d+)[.)]', re.MULTILINE)
+
+
+def split_sections(text: str, count: int) -> List[Optional[str]]:
+    """
+    Split a multi-destination generation into its numbered sections.
+    
+    Returns one entry per destination, None where the section is missing or empty.
+    """
+    sections = [None] * count
+    if not text:
+        return sections
+    
+    headers = list(SECTION_HEADER.finditer(text))
+    for header, following in zip(headers, headers[1:] + [None]):
+        number = int(header.group(1))
+        if not 1 <= number <= count or sections[number - 1] is not None:
+            continue
+        
+        # Drop the rest of the header line (the destination name) and keep the body
+        body_start = text.find('\n', header.end())
+        body_end = following.start() if following is not None else len(text)
+        body = text[body_start:body_end].strip() if body_start != -1 and body_start < body_end else ''
+        sections[number - 1] = body or None
+    
+    return sections
+
+
+def get_llm_response_cache() -> PersistentCache:
+    """Process-wide LLM response cache, stored under TRIPX_CACHE_DIR (default data/cache)."""
+    global _response_cache
+    
+    with _response_cache_lock:
+        if _response_cache is None:
+            cache_dir = os.getenv('TRIPX_CACHE_DIR', os.path.join('data', 'cache'))
+            _response_cache = PersistentCache(
+                os.path.join(cache_dir, 'llm_responses.sqlite'),
+                max_memory_entries=int(os.getenv('TRIPX_LLM_CACHE_MEMORY_ENTRIES', 1024)),
+                max_disk_entries=int(os.getenv('TRIPX_LLM_CACHE_DISK_ENTRIES', 50000)),
+                ttl=float(os.getenv('TRIPX_LLM_CACHE_TTL', 7 * 24 * 3600))
+            )
+    
+    return _response_cache
+
 
 class FreeLLMEngine:
     """
     LLM Engine using free APIs for text generation.
     
     Note: ML makes decisions, LLM only generates text.
+    
+    Provider calls get a deadline derived from the provider's recent p95 latency and
+    are skipped outright while its circuit breaker is open. With hedge_provider (or
+    TRIPX_LLM_HEDGE_PROVIDER), a call still running after the primary's p95 is raced
+    against the same prompt on the second provider and the first answer wins.
+    
+    provider='mock' answers from a seeded MockProvider (mock_provider, or the shared one
+    configured by TRIPX_MOCK_*) with no network, through the same cache, coalescing and
+    resilience paths as a real provider.
     """
     
-    def __init__(self, provider: str = "groq"):
+    # Deadline for a provider call before any latency has been observed
+    provider_timeouts = {'groq': 30.0, 'huggingface': 30.0, 'ollama': 60.0, 'mock': 30.0}
+    
+    def __init__(self, provider: str = "groq", use_cache: bool = True, hedge_provider: Optional[str] = None,
+                 hedge_delay: float = 2.0, mock_provider: Optional[MockProvider] = None):
         self.provider = provider
+        self.mock_provider = mock_provider
+        self.http_pool = get_http_pool()
+        self.response_cache = get_llm_response_cache() if use_cache else None
+        self.provider_calls = 0
+        self.coalesced_calls = 0
         self.setup_llm_client()
+        
+        self.health = get_provider_health(provider, self.provider_timeouts.get(provider, 30.0))
+        
+        # Used until the primary has enough latency samples to hedge at its p95
+        self.hedge_delay = hedge_delay
+        if hedge_provider is None:
+            hedge_provider = os.getenv('TRIPX_LLM_HEDGE_PROVIDER')
+        self.hedge_engine = None
+        if hedge_provider and hedge_provider != provider:
+            # An empty hedge_provider keeps the hedge engine from hedging in turn
+            self.hedge_engine = FreeLLMEngine(hedge_provider, use_cache=False, hedge_provider='',
+                                              mock_provider=mock_provider)
     
     def setup_llm_client(self):
         """Setup free LLM client"""
@@ -33,25 +126,374 @@ class FreeLLMEngine:
             self.base_url = "http://localhost:11434/api/generate"
             self.model = "llama2"
             self.api_key = None
+        
+        elif self.provider == "mock":
+            # Offline and seeded, for load testing without network or API keys
+            if self.mock_provider is None:
+                self.mock_provider = get_mock_provider()
+            self.base_url = None
+            self.model = f"mock-{self.mock_provider.seed}"
+            self.api_key = None
+    
+    def connection_stats(self) -> Dict[str, Dict]:
+        """Per-host connection reuse counts for the shared HTTP pool."""
+        return self.http_pool.connection_stats()
     
     def generate_text(self, prompt: str, max_tokens: int = 500) -> str:
         """Generate text using free LLM API - only for text, not decisions."""
+        return run_sync(self.agenerate_text(prompt, max_tokens))
+    
+    async def agenerate_text(self, prompt: str, max_tokens: int = 500) -> str:
+        """Async counterpart of generate_text, sharing one HTTP client per event loop."""
         try:
             if self.api_key == 'demo_key':
                 return self._mock_llm_response(prompt)
             
-            if self.provider == "groq":
-                return self._call_groq_api(prompt, max_tokens)
-            elif self.provider == "huggingface":
-                return self._call_huggingface_api(prompt, max_tokens)
-            elif self.provider == "ollama":
-                return self._call_ollama_api(prompt, max_tokens)
+            cache_key = self._cache_key(prompt, max_tokens)
+            if self.response_cache is not None:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    return cached
+            
+            # Shielded so one caller giving up doesn't cancel the call for the others
+            return await asyncio.shield(self._generation_task(cache_key, prompt, max_tokens))
         
         except Exception as e:
             return f"LLM generation failed: {str(e)}. Using fallback text generation."
     
+    def _generation_task(self, cache_key: str, prompt: str, max_tokens: int) -> asyncio.Task:
+        """The in-flight provider call for this prompt, started if there isn't one on this loop."""
+        task = _in_flight_generations.get(cache_key)
+        
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced_calls += 1
+            return task
+        
+        task = asyncio.ensure_future(self._agenerate_uncached(cache_key, prompt, max_tokens))
+        _in_flight_generations[cache_key] = task
+        
+        def forget(done: asyncio.Task):
+            if _in_flight_generations.get(cache_key) is done:
+                del _in_flight_generations[cache_key]
+        
+        task.add_done_callback(forget)
+        return task
+    
+    async def _agenerate_uncached(self, cache_key: str, prompt: str, max_tokens: int) -> Optional[str]:
+        if self.hedge_engine is None:
+            text = await self._acall_guarded(prompt, max_tokens)
+        else:
+            text = await self._acall_hedged(prompt, max_tokens)
+        
+        # Only real generations are cached, never fallback text
+        if self.response_cache is not None and text is not None:
+            await self.response_cache.aset(cache_key, text)
+        
+        return text
+    
+    async def _acall_provider(self, prompt: str, max_tokens: int) -> Optional[str]:
+        self.provider_calls += 1
+        
+        if self.provider == "groq":
+            return await self._acall_groq_api(prompt, max_tokens)
+        elif self.provider == "huggingface":
+            return await self._acall_huggingface_api(prompt, max_tokens)
+        elif self.provider == "ollama":
+            return await self._acall_ollama_api(prompt, max_tokens)
+        elif self.provider == "mock":
+            return await self.mock_provider.acomplete(prompt, max_tokens)
+        return None
+    
+    async def _acall_guarded(self, prompt: str, max_tokens: int) -> Optional[str]:
+        """One provider call under the circuit breaker and the latency-derived deadline."""
+        health = self.health
+        if not health.allow():
+            raise CircuitOpenError(f"{self.provider} is failing; skipped while its circuit is open")
+        
+        started = time.monotonic()
+        try:
+            text = await asyncio.wait_for(self._acall_provider(prompt, max_tokens), health.timeout())
+        except asyncio.CancelledError:
+            health.breaker.record_abandoned()
+            raise
+        except Exception:
+            health.record_failure()
+            raise
+        
+        health.record_success(time.monotonic() - started)
+        return text
+    
+    async def _acall_hedged(self, prompt: str, max_tokens: int) -> Optional[str]:
+        """Race the primary provider against the hedge provider once the primary runs past its p95."""
+        hedge = self.hedge_engine
+        primary = asyncio.ensure_future(self._acall_guarded(prompt, max_tokens))
+        
+        done, _ = await asyncio.wait({primary}, timeout=self.health.hedge_delay(self.hedge_delay))
+        if done and primary.exception() is None:
+            return primary.result()
+        
+        attempts = {primary, asyncio.ensure_future(hedge._acall_guarded(prompt, max_tokens))}
+        error = None
+        
+        while attempts:
+            done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    for other in attempts:
+                        other.cancel()
+                    return attempt.result()
+                error = attempt.exception()
+        
+        raise error
+    
+    def resilience_stats(self) -> Dict[str, Dict]:
+        """Breaker state, latency percentiles and current deadline per provider."""
+        stats = {self.provider: self.health.stats()}
+        if self.hedge_engine is not None:
+            stats[self.hedge_engine.provider] = self.hedge_engine.health.stats()
+        return stats
+    
+    def stream_text(self, prompt: str, max_tokens: int = 500) -> Iterator[str]:
+        """Like generate_text, but yields the text in chunks as the provider produces them."""
+        return iterate_sync(self.astream_text(prompt, max_tokens))
+    
+    async def astream_text(self, prompt: str, max_tokens: int = 500) -> AsyncIterator[str]:
+        """
+        Async counterpart of stream_text, with the same deadlines and hedging as agenerate_text.
+        
+        The first chunk has to arrive within the provider's first-chunk deadline and the
+        whole stream within its call deadline. With a hedge provider, a stream that has not
+        produced its first chunk by the primary's first-chunk p95 is raced against one from
+        the hedge provider. Once text has been yielded there is no fallback, so a failure
+        mid-stream just ends the text early.
+        """
+        chunks = []
+        
+        try:
+            if self.api_key == 'demo_key':
+                for word in self._mock_llm_response(prompt).split(' '):
+                    chunks.append(word)
+                    yield word if len(chunks) == 1 else ' ' + word
+                return
+            
+            cache_key = self._cache_key(prompt, max_tokens)
+            if self.response_cache is not None:
+                cached = await self.response_cache.aget(cache_key)
+                if cached is not None:
+                    yield cached
+                    return
+            
+            if self.hedge_engine is None:
+                stream = self._astream_guarded(prompt, max_tokens)
+            else:
+                stream = self._astream_hedged(prompt, max_tokens)
+            
+            try:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+            finally:
+                # Settles the provider's health at once if the reader stopped early
+                await stream.aclose()
+            
+            if self.response_cache is not None and chunks:
+                await self.response_cache.aset(cache_key, ''.join(chunks))
+        
+        except Exception as e:
+            if not chunks:
+                yield f"LLM generation failed: {str(e)}. Using fallback text generation."
+    
+    async def _astream_guarded(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        """One provider stream under the circuit breaker, the first-chunk deadline and the call deadline."""
+        health = self.health
+        if not health.allow():
+            raise CircuitOpenError(f"{self.provider} is failing; skipped while its circuit is open")
+        
+        stream = self._provider_stream(prompt, max_tokens)
+        if stream is None:
+            health.breaker.record_abandoned()
+            return
+        
+        started = time.monotonic()
+        deadline = started + health.timeout()
+        first_chunk_deadline = min(deadline, started + health.first_chunk_timeout())
+        received = False
+        succeeded = None
+        
+        try:
+            while True:
+                # Timeouts on the client are per read; these bound the stream as a whole
+                remaining = (deadline if received else first_chunk_deadline) - time.monotonic()
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), max(remaining, 0))
+                except StopAsyncIteration:
+                    break
+                
+                if not received:
+                    received = True
+                    health.record_first_chunk(time.monotonic() - started)
+                yield chunk
+            succeeded = True
+        except Exception:
+            succeeded = False
+            raise
+        finally:
+            if succeeded:
+                health.record_success(time.monotonic() - started)
+            elif succeeded is False:
+                health.record_failure()
+            else:
+                # The reader stopped early, or a hedge won
+                health.breaker.record_abandoned()
+            await stream.aclose()
+    
+    async def _astream_hedged(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        """
+        Stream from whichever provider produces a first chunk first.
+        
+        The hedge stream starts once the primary has gone its first-chunk p95 without a
+        chunk, or as soon as it fails before producing one. The losing stream is closed.
+        """
+        primary = self._astream_guarded(prompt, max_tokens)
+        attempts = {asyncio.ensure_future(self._first_chunk(primary)): primary}
+        
+        done, _ = await asyncio.wait(set(attempts), timeout=self.health.stream_hedge_delay(self.hedge_delay))
+        if not done or next(iter(done)).exception() is not None:
+            secondary = self.hedge_engine._astream_guarded(prompt, max_tokens)
+            attempts[asyncio.ensure_future(self._first_chunk(secondary))] = secondary
+        
+        winner, first, error = None, None, None
+        try:
+            while attempts and winner is None:
+                done, _ = await asyncio.wait(set(attempts), return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    stream = attempts.pop(attempt)
+                    if attempt.exception() is not None:
+                        error = attempt.exception()
+                    elif winner is None:
+                        winner, first = stream, attempt.result()
+                    else:
+                        await stream.aclose()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+            for stream in attempts.values():
+                await stream.aclose()
+        
+        if winner is None:
+            raise error
+        
+        try:
+            if first is not None:
+                yield first
+                async for chunk in winner:
+                    yield chunk
+        finally:
+            await winner.aclose()
+    
+    async def _first_chunk(self, stream: AsyncIterator[str]) -> Optional[str]:
+        """The stream's first chunk, or None if it ends without one."""
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    def _provider_stream(self, prompt: str, max_tokens: int) -> Optional[AsyncIterator[str]]:
+        if self.provider == "groq":
+            return self._astream_groq_api(prompt, max_tokens)
+        elif self.provider == "ollama":
+            return self._astream_ollama_api(prompt, max_tokens)
+        elif self.provider == "huggingface":
+            # The inference API has no token stream; deliver the whole generation at once
+            return self._single_chunk(self._acall_huggingface_api(prompt, max_tokens))
+        elif self.provider == "mock":
+            return self.mock_provider.astream(prompt, max_tokens)
+        return None
+    
+    async def _astream_groq_api(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+            "stream": True
+        }
+        
+        async with self.http_pool.client().stream("POST", self.base_url, headers=headers, json=payload,
+                                                  timeout=30) as response:
+            if response.status_code != 200:
+                raise Exception(f"Groq API error: {response.status_code}")
+            
+            # Server-sent events: one "data: {json}" line per delta, ending with "data: [DONE]"
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                content = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                if content:
+                    yield content
+    
+    async def _astream_ollama_api(self, prompt: str, max_tokens: int) -> AsyncIterator[str]:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {
+                "num_predict": max_tokens,
+                "temperature": 0.7
+            }
+        }
+        
+        async with self.http_pool.client().stream("POST", self.base_url, json=payload, timeout=60) as response:
+            if response.status_code != 200:
+                raise Exception(f"Ollama API error: {response.status_code}")
+            
+            # Newline-delimited JSON objects, the last one flagged "done"
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get('response'):
+                    yield data['response']
+                if data.get('done'):
+                    break
+    
+    async def _single_chunk(self, coroutine) -> AsyncIterator[str]:
+        yield await coroutine
+    
+    def _cache_key(self, prompt: str, max_tokens: int) -> str:
+        content = json.dumps([self.provider, self.model, prompt, max_tokens])
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    def cache_stats(self) -> Dict:
+        """Hit and miss counts for the shared response cache."""
+        return self.response_cache.stats() if self.response_cache is not None else {}
+    
+    def call_stats(self) -> Dict:
+        """Provider calls made by this engine, and calls that joined an identical one in flight."""
+        return {'provider_calls': self.provider_calls, 'coalesced_calls': self.coalesced_calls}
+    
     def _call_groq_api(self, prompt: str, max_tokens: int) -> str:
         """Call Groq API (LLaMA-3)"""
+        return run_sync(self._acall_groq_api(prompt, max_tokens))
+    
+    def _call_huggingface_api(self, prompt: str, max_tokens: int) -> str:
+        """Call Hugging Face Inference API"""
+        return run_sync(self._acall_huggingface_api(prompt, max_tokens))
+    
+    def _call_ollama_api(self, prompt: str, max_tokens: int) -> str:
+        """Call local Ollama API"""
+        return run_sync(self._acall_ollama_api(prompt, max_tokens))
+    
+    async def _acall_groq_api(self, prompt: str, max_tokens: int) -> str:
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -64,7 +506,7 @@ class FreeLLMEngine:
             "temperature": 0.7
         }
         
-        response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
+        response = await self.http_pool.client().post(self.base_url, headers=headers, json=payload, timeout=30)
         
         if response.status_code == 200:
             data = response.json()
@@ -72,8 +514,7 @@ class FreeLLMEngine:
         else:
             raise Exception(f"Groq API error: {response.status_code}")
     
-    def _call_huggingface_api(self, prompt: str, max_tokens: int) -> str:
-        """Call Hugging Face Inference API"""
+    async def _acall_huggingface_api(self, prompt: str, max_tokens: int) -> str:
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -88,7 +529,7 @@ class FreeLLMEngine:
             }
         }
         
-        response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
+        response = await self.http_pool.client().post(self.base_url, headers=headers, json=payload, timeout=30)
         
         if response.status_code == 200:
             data = response.json()
@@ -96,8 +537,7 @@ class FreeLLMEngine:
         else:
             raise Exception(f"HuggingFace API error: {response.status_code}")
     
-    def _call_ollama_api(self, prompt: str, max_tokens: int) -> str:
-        """Call local Ollama API"""
+    async def _acall_ollama_api(self, prompt: str, max_tokens: int) -> str:
         payload = {
             "model": self.model,
             "prompt": prompt,
@@ -108,7 +548,7 @@ class FreeLLMEngine:
             }
         }
         
-        response = requests.post(self.base_url, json=payload, timeout=60)
+        response = await self.http_pool.client().post(self.base_url, json=payload, timeout=60)
         
         if response.status_code == 200:
             data = response.json()
@@ -118,6 +558,12 @@ class FreeLLMEngine:
     
     def _mock_llm_response(self, prompt: str) -> str:
         """Mock LLM response for demo purposes"""
+        # Multi-destination prompts list a numbered header per destination; answer each section
+        headers = re.findall(r'^### \d+\. .+$', prompt, re.MULTILINE)
+        if headers:
+            body = self._mock_llm_response(re.sub(r'^### .*$', '', prompt, flags=re.MULTILINE))
+            return "\n\n".join(f"{header}\n{body}" for header in dict.fromkeys(headers))
+        
         if "itinerary" in prompt.lower():
             return """Day 1: Arrival and City Center
 - Morning: Arrive and check into accommodation
@@ -142,15 +588,62 @@ Day 3: Nature and Relaxation
 
 
 class FreeAPIIntegrator:
+    """
+    Weather (Open-Meteo) and attractions (OpenTripMap) lookups behind shared caches.
     
-    def __init__(self):
+    provider='mock' (default: the TRIPX_API_PROVIDER environment variable, else 'live')
+    answers both from a seeded MockProvider instead of the network.
+    """
+    
+    def __init__(self, weather_ttl: float = 1800, attractions_ttl: float = 7 * 24 * 3600,
+                 provider: Optional[str] = None, mock_provider: Optional[MockProvider] = None):
+        self.provider = provider if provider is not None else os.getenv('TRIPX_API_PROVIDER', 'live')
+        self.mock_provider = mock_provider
+        if self.provider == 'mock' and self.mock_provider is None:
+            self.mock_provider = get_mock_provider()
+        
         self.weather_base_url = "https://api.open-meteo.com/v1/forecast"
         self.places_base_url = "https://api.opentripmap.com/0.1/en/places"
         self.opentripmap_key = os.getenv('OPENTRIPMAP_KEY', 'demo_key')
+        self.http_pool = get_http_pool()
+        
+        # Forecasts move hourly, attractions almost never; expired entries are served while refreshing
+        self.weather_cache = StaleWhileRevalidateCache(ttl=weather_ttl, stale_ttl=6 * 3600)
+        self.attractions_cache = StaleWhileRevalidateCache(ttl=attractions_ttl, stale_ttl=30 * 24 * 3600)
+        
+        # Decimal places kept when bucketing coordinates (1 ~ 11 km, 2 ~ 1 km)
+        self.weather_key_precision = 1
+        self.attractions_key_precision = 2
+    
+    def connection_stats(self) -> Dict[str, Dict]:
+        """Per-host connection reuse counts for the shared HTTP pool."""
+        return self.http_pool.connection_stats()
+    
+    def cache_stats(self) -> Dict[str, Dict]:
+        return {
+            'weather': self.weather_cache.stats(),
+            'attractions': self.attractions_cache.stats()
+        }
     
     def get_weather_data(self, latitude: float, longitude: float) -> Dict:
         """Get weather data using Open-Meteo (free, no API key needed)"""
+        return run_sync(self.aget_weather_data(latitude, longitude))
+    
+    async def aget_weather_data(self, latitude: float, longitude: float) -> Dict:
+        key = (round(latitude, self.weather_key_precision), round(longitude, self.weather_key_precision))
+        
+        weather = await self.weather_cache.get_or_fetch(key, lambda: self._afetch_weather_data(latitude, longitude))
+        
+        if weather is None:
+            return self._mock_weather_data(latitude, longitude)
+        
+        return copy.deepcopy(weather)
+    
+    async def _afetch_weather_data(self, latitude: float, longitude: float) -> Optional[Dict]:
         try:
+            if self.provider == 'mock':
+                return await self.mock_provider.aweather(latitude, longitude)
+            
             params = {
                 'latitude': latitude,
                 'longitude': longitude,
@@ -159,7 +652,7 @@ class FreeAPIIntegrator:
                 'forecast_days': 7
             }
             
-            response = requests.get(self.weather_base_url, params=params, timeout=10)
+            response = await self.http_pool.client().get(self.weather_base_url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -171,15 +664,33 @@ class FreeAPIIntegrator:
                 }
         
         except Exception as e:
-            return self._mock_weather_data()
+            return None
         
-        return self._mock_weather_data()
+        return None
     
     def get_attractions(self, latitude: float, longitude: float, radius: int = 5000) -> List[Dict]:
         """Get attractions using OpenTripMap (free tier available)"""
+        return run_sync(self.aget_attractions(latitude, longitude, radius))
+    
+    async def aget_attractions(self, latitude: float, longitude: float, radius: int = 5000) -> List[Dict]:
+        if self.opentripmap_key == 'demo_key' and self.provider != 'mock':
+            return self._mock_attractions_data()
+        
+        key = (round(latitude, self.attractions_key_precision), round(longitude, self.attractions_key_precision), radius)
+        
+        attractions = await self.attractions_cache.get_or_fetch(
+            key, lambda: self._afetch_attractions(latitude, longitude, radius)
+        )
+        
+        if attractions is None:
+            return self._mock_attractions_data()
+        
+        return copy.deepcopy(attractions)
+    
+    async def _afetch_attractions(self, latitude: float, longitude: float, radius: int) -> Optional[List[Dict]]:
         try:
-            if self.opentripmap_key == 'demo_key':
-                return self._mock_attractions_data()
+            if self.provider == 'mock':
+                return await self.mock_provider.aattractions(latitude, longitude, radius)
             
             params = {
                 'radius': radius,
@@ -191,7 +702,7 @@ class FreeAPIIntegrator:
                 'apikey': self.opentripmap_key
             }
             
-            response = requests.get(f"{self.places_base_url}/radius", params=params, timeout=10)
+            response = await self.http_pool.client().get(f"{self.places_base_url}/radius", params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -205,19 +716,20 @@ class FreeAPIIntegrator:
                 ]
         
         except Exception as e:
-            return self._mock_attractions_data()
+            return None
         
-        return self._mock_attractions_data()
+        return None
     
-    def _mock_weather_data(self) -> Dict:
-        """Mock weather data for demo"""
+    def _mock_weather_data(self, latitude: float = 0.0, longitude: float = 0.0) -> Dict:
+        """Mock weather data for demo, the same every time for the same place"""
         import random
+        rng = random.Random(f"{latitude:.1f},{longitude:.1f}")
         return {
-            'current_temp': round(random.uniform(15, 28), 1),
-            'weather_code': random.choice([0, 1, 2, 3]),  # 0=clear, 1=partly cloudy, etc.
+            'current_temp': round(rng.uniform(15, 28), 1),
+            'weather_code': rng.choice([0, 1, 2, 3]),  # 0=clear, 1=partly cloudy, etc.
             'daily_forecast': {
-                'temperature_2m_max': [random.randint(20, 30) for _ in range(7)],
-                'temperature_2m_min': [random.randint(10, 20) for _ in range(7)]
+                'temperature_2m_max': [rng.randint(20, 30) for _ in range(7)],
+                'temperature_2m_min': [rng.randint(10, 20) for _ in range(7)]
             },
             'status': 'success'
         }
@@ -235,11 +747,17 @@ class FreeAPIIntegrator:
 
 class TravelItineraryGenerator:
     
-    def __init__(self, llm_provider: str = "groq"):
-        self.llm_engine = FreeLLMEngine(llm_provider)
-        self.api_integrator = FreeAPIIntegrator()
+    def __init__(self, llm_provider: str = "groq", max_concurrency: int = 8, hedge_provider: Optional[str] = None,
+                 mock_provider: Optional[MockProvider] = None):
+        self.llm_engine = FreeLLMEngine(llm_provider, hedge_provider=hedge_provider, mock_provider=mock_provider)
+        # A mock LLM means a fully offline run, so the travel data APIs are mocked too
+        self.api_integrator = FreeAPIIntegrator(provider='mock' if llm_provider == 'mock' else None,
+                                                mock_provider=mock_provider)
         
-        # Coordinate mapping for major cities (in production, use geocoding API)
+        # Upper bound on network calls in flight during concurrent enrichment
+        self.max_concurrency = max_concurrency
+        
+        # Fallback for destinations whose catalog entry carries no precomputed coordinates
         self.city_coordinates = {
             'Paris': (48.8566, 2.3522),
             'Tokyo': (35.6762, 139.6503),
@@ -254,18 +772,159 @@ class TravelItineraryGenerator:
         }
     
     def generate_itinerary(self, user_preferences: Dict, ml_recommendations: List[Dict]) -> Dict:
+        return run_sync(self.agenerate_itinerary(user_preferences, ml_recommendations))
+    
+    async def agenerate_itinerary(self, user_preferences: Dict, ml_recommendations: List[Dict]) -> Dict:
         
         if not ml_recommendations:
             return {'error': 'No ML recommendations provided'}
         
         primary_destination = ml_recommendations[0]
         
-        weather_data = self._get_destination_weather(primary_destination)
-        attractions = self._get_destination_attractions(primary_destination)
+        weather_data = await self._aget_destination_weather(primary_destination)
+        attractions = await self._aget_destination_attractions(primary_destination)
+        
+        itinerary_text = await self._agenerate_itinerary_text(user_preferences, primary_destination, attractions)
+        
+        explanation = await self._agenerate_explanation_text(user_preferences, primary_destination)
+        
+        return self._build_itinerary(user_preferences, ml_recommendations, weather_data, attractions,
+                                     itinerary_text, explanation)
+    
+    def generate_itineraries_concurrently(self, user_preferences: Dict, ml_recommendations: List[Dict]) -> List[Dict]:
+        """
+        One itinerary per recommendation, same as generate_itinerary(user_preferences, [rec]) for each,
+        with every network call fanned out at once, at most max_concurrency in flight.
+        """
+        return run_sync(self.agenerate_itineraries_concurrently(user_preferences, ml_recommendations))
+    
+    async def agenerate_itineraries_concurrently(self, user_preferences: Dict,
+                                                 ml_recommendations: List[Dict]) -> List[Dict]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        return list(await asyncio.gather(*(
+            self.aenrich_destination(user_preferences, destination, semaphore)
+            for destination in ml_recommendations
+        )))
+    
+    async def aenrich_destination(self, user_preferences: Dict, destination: Dict,
+                                  semaphore: Optional[asyncio.Semaphore] = None,
+                                  on_stage: Optional[Callable[[str, float, bool], None]] = None,
+                                  on_itinerary_chunk: Optional[Callable[[str], None]] = None) -> Dict:
+        """
+        Itinerary for one recommendation with its network calls run concurrently, gated by semaphore.
+        
+        on_stage(stage, seconds, succeeded) is called as each of weather, attractions, itinerary
+        and explanation finishes. With on_itinerary_chunk, the itinerary is streamed and the
+        callback gets each chunk of text as the provider produces it.
+        """
+        
+        def stage(name, coroutine):
+            report = (lambda seconds, succeeded: on_stage(name, seconds, succeeded)) if on_stage else None
+            return self._timed_stage(coroutine, semaphore, report)
+        
+        # The itinerary prompt needs the attractions, so those two calls are chained
+        async def attractions_and_itinerary():
+            attractions = await stage('attractions', self._aget_destination_attractions(destination))
+            if on_itinerary_chunk is None:
+                itinerary = self._agenerate_itinerary_text(user_preferences, destination, attractions)
+            else:
+                itinerary = self._astream_itinerary_text(user_preferences, destination, attractions,
+                                                         on_itinerary_chunk)
+            itinerary_text = await stage('itinerary', itinerary)
+            return attractions, itinerary_text
+        
+        weather_data, (attractions, itinerary_text), explanation = await self._gather_stages(
+            stage('weather', self._aget_destination_weather(destination)),
+            attractions_and_itinerary(),
+            stage('explanation', self._agenerate_explanation_text(user_preferences, destination))
+        )
+        
+        return self._build_itinerary(user_preferences, [destination], weather_data, attractions,
+                                     itinerary_text, explanation)
+    
+    async def aenrich_destinations_batched(self, user_preferences: Dict, destinations: List[Dict],
+                                           semaphore: Optional[asyncio.Semaphore] = None,
+                                           on_stage: Optional[Callable[[int, str, float, bool], None]] = None
+                                           ) -> List[Dict]:
+        """
+        aenrich_destination for every destination, with one LLM call for all the explanations
+        and one for all the itineraries instead of two calls per destination.
+        
+        on_stage(index, stage, seconds, succeeded) is called per destination; the batched
+        stages report the same duration for each of them.
+        """
+        
+        def stage(name, indices, coroutine):
+            def report(seconds, succeeded):
+                for index in indices:
+                    on_stage(index, name, seconds, succeeded)
+            return self._timed_stage(coroutine, semaphore, report if on_stage else None)
+        
+        everyone = range(len(destinations))
+        
+        async def attractions_and_itineraries():
+            attractions = await asyncio.gather(*(
+                stage('attractions', [i], self._aget_destination_attractions(destination))
+                for i, destination in enumerate(destinations)
+            ))
+            itineraries = await stage('itinerary', everyone,
+                                      self._agenerate_itinerary_texts(user_preferences, destinations, attractions))
+            return attractions, itineraries
+        
+        weather, (attractions, itineraries), explanations = await self._gather_stages(
+            asyncio.gather(*(
+                stage('weather', [i], self._aget_destination_weather(destination))
+                for i, destination in enumerate(destinations)
+            )),
+            attractions_and_itineraries(),
+            stage('explanation', everyone, self._agenerate_explanation_texts(user_preferences, destinations))
+        )
+        
+        return [
+            self._build_itinerary(user_preferences, [destination], weather[i], attractions[i],
+                                  itineraries[i], explanations[i])
+            for i, destination in enumerate(destinations)
+        ]
+    
+    async def _gather_stages(self, *coroutines) -> List:
+        """
+        asyncio.gather that cancels the other stages as soon as one fails.
         
-        itinerary_text = self._generate_itinerary_text(user_preferences, primary_destination, attractions)
+        A plain gather raises on the first failure but leaves the rest running, so they
+        would keep using the semaphore and report stages for a destination that already failed.
+        """
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # Let the cancelled stages report before the failure propagates
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    
+    async def _timed_stage(self, coroutine, semaphore: Optional[asyncio.Semaphore],
+                           report: Optional[Callable[[float, bool], None]]):
+        async def timed():
+            started = time.perf_counter()
+            succeeded = False
+            try:
+                result = await coroutine
+                succeeded = True
+                return result
+            finally:
+                if report is not None:
+                    report(time.perf_counter() - started, succeeded)
         
-        explanation = self._generate_explanation_text(user_preferences, primary_destination)
+        if semaphore is None:
+            return await timed()
+        async with semaphore:
+            return await timed()
+    
+    def _build_itinerary(self, user_preferences: Dict, ml_recommendations: List[Dict], weather_data: Dict,
+                         attractions: List[Dict], itinerary_text: str, explanation: str) -> Dict:
+        primary_destination = ml_recommendations[0]
         
         itinerary = {
             'destination': primary_destination,
@@ -284,30 +943,110 @@ class TravelItineraryGenerator:
     
     def _get_destination_weather(self, destination: Dict) -> Dict:
         """Get weather data for destination"""
-        dest_name = destination['destination']
-        coordinates = self.city_coordinates.get(dest_name, (0, 0))
+        return run_sync(self._aget_destination_weather(destination))
+    
+    def _destination_coordinates(self, destination: Dict) -> Tuple[float, float]:
+        """Coordinates geocoded into the catalog at preprocessing time, else the city_coordinates fallback."""
+        latitude, longitude = destination.get('latitude'), destination.get('longitude')
+        if latitude is not None and longitude is not None and not (math.isnan(latitude) or math.isnan(longitude)):
+            return latitude, longitude
+        return self.city_coordinates.get(destination['destination'], (0, 0))
+    
+    async def _aget_destination_weather(self, destination: Dict) -> Dict:
+        coordinates = self._destination_coordinates(destination)
         
         if coordinates != (0, 0):
-            return self.api_integrator.get_weather_data(coordinates[0], coordinates[1])
+            return await self.api_integrator.aget_weather_data(coordinates[0], coordinates[1])
         else:
             return self.api_integrator._mock_weather_data()
     
     def _get_destination_attractions(self, destination: Dict) -> List[Dict]:
         """Get attractions for destination"""
-        dest_name = destination['destination']
-        coordinates = self.city_coordinates.get(dest_name, (0, 0))
+        return run_sync(self._aget_destination_attractions(destination))
+    
+    async def _aget_destination_attractions(self, destination: Dict) -> List[Dict]:
+        coordinates = self._destination_coordinates(destination)
         
         if coordinates != (0, 0):
-            return self.api_integrator.get_attractions(coordinates[0], coordinates[1])
+            return await self.api_integrator.aget_attractions(coordinates[0], coordinates[1])
         else:
             return self.api_integrator._mock_attractions_data()
     
     def _generate_itinerary_text(self, user_prefs: Dict, destination: Dict, attractions: List[Dict]) -> str:
         """Generate day-wise itinerary using LLM"""
+        return run_sync(self._agenerate_itinerary_text(user_prefs, destination, attractions))
+    
+    async def _agenerate_itinerary_text(self, user_prefs: Dict, destination: Dict, attractions: List[Dict]) -> str:
+        prompt = self._itinerary_prompt(user_prefs, destination, attractions)
+        return await self.llm_engine.agenerate_text(prompt, max_tokens=600)
+    
+    async def _astream_itinerary_text(self, user_prefs: Dict, destination: Dict, attractions: List[Dict],
+                                      on_chunk: Callable[[str], None]) -> str:
+        prompt = self._itinerary_prompt(user_prefs, destination, attractions)
+        chunks = []
+        async for chunk in self.llm_engine.astream_text(prompt, max_tokens=600):
+            chunks.append(chunk)
+            on_chunk(chunk)
+        return ''.join(chunks)
+    
+    def stream_itinerary_text(self, user_prefs: Dict, destination: Dict,
+                              attractions: Optional[List[Dict]] = None) -> Iterator[str]:
+        """Yield the day-wise itinerary as it is generated, for progressive rendering."""
+        if attractions is None:
+            attractions = self._get_destination_attractions(destination)
+        
+        prompt = self._itinerary_prompt(user_prefs, destination, attractions)
+        return self.llm_engine.stream_text(prompt, max_tokens=600)
+    
+    def _generate_explanation_text(self, user_prefs: Dict, destination: Dict) -> str:
+        """Generate explanation using LLM"""
+        return run_sync(self._agenerate_explanation_text(user_prefs, destination))
+    
+    async def _agenerate_explanation_text(self, user_prefs: Dict, destination: Dict) -> str:
+        prompt = self._explanation_prompt(user_prefs, destination)
+        return await self.llm_engine.agenerate_text(prompt, max_tokens=200)
+    
+    async def _agenerate_itinerary_texts(self, user_prefs: Dict, destinations: List[Dict],
+                                         attractions: List[List[Dict]]) -> List[str]:
+        """Itineraries for several destinations from one generation, falling back per destination."""
+        if len(destinations) == 1:
+            return [await self._agenerate_itinerary_text(user_prefs, destinations[0], attractions[0])]
+        
+        prompt = self._batch_itinerary_prompt(user_prefs, destinations, attractions)
+        text = await self.llm_engine.agenerate_text(prompt, max_tokens=600 * len(destinations))
+        
+        return await self._fill_missing_sections(split_sections(text, len(destinations)), [
+            lambda i=i: self._agenerate_itinerary_text(user_prefs, destinations[i], attractions[i])
+            for i in range(len(destinations))
+        ])
+    
+    async def _agenerate_explanation_texts(self, user_prefs: Dict, destinations: List[Dict]) -> List[str]:
+        """Explanations for several destinations from one generation, falling back per destination."""
+        if len(destinations) == 1:
+            return [await self._agenerate_explanation_text(user_prefs, destinations[0])]
+        
+        prompt = self._batch_explanation_prompt(user_prefs, destinations)
+        text = await self.llm_engine.agenerate_text(prompt, max_tokens=200 * len(destinations))
+        
+        return await self._fill_missing_sections(split_sections(text, len(destinations)), [
+            lambda i=i: self._agenerate_explanation_text(user_prefs, destinations[i])
+            for i in range(len(destinations))
+        ])
+    
+    async def _fill_missing_sections(self, sections: List[Optional[str]], fallbacks: List[Callable]) -> List[str]:
+        missing = [i for i, section in enumerate(sections) if section is None]
         
+        if missing:
+            print(f"Batched generation missed {len(missing)} of {len(sections)} sections; generating them individually")
+            for i, text in zip(missing, await asyncio.gather(*(fallbacks[i]() for i in missing))):
+                sections[i] = text
+        
+        return sections
+    
+    def _itinerary_prompt(self, user_prefs: Dict, destination: Dict, attractions: List[Dict]) -> str:
         attractions_text = ", ".join([attr['name'] for attr in attractions[:3]])
         
-        prompt = f"""Create a {user_prefs.get('duration', 7)}-day travel itinerary for {destination['destination']}, {destination['country']}.
+        return f"""Create a {user_prefs.get('duration', 7)}-day travel itinerary for {destination['destination']}, {destination['country']}.
 
 Trip Details:
 - Budget: ${user_prefs.get('budget', 100)}/day
@@ -316,13 +1055,9 @@ Trip Details:
 - Top Attractions: {attractions_text}
 
 Create a day-by-day itinerary with morning, afternoon, and evening activities. Keep it practical and budget-conscious."""
-
-        return self.llm_engine.generate_text(prompt, max_tokens=600)
     
-    def _generate_explanation_text(self, user_prefs: Dict, destination: Dict) -> str:
-        """Generate explanation using LLM"""
-        
-        prompt = f"""Explain why {destination['destination']}, {destination['country']} is an excellent choice for this traveler:
+    def _explanation_prompt(self, user_prefs: Dict, destination: Dict) -> str:
+        return f"""Explain why {destination['destination']}, {destination['country']} is an excellent choice for this traveler:
 
 Traveler Profile:
 - Budget: ${user_prefs.get('budget', 100)}/day
@@ -337,8 +1072,60 @@ Destination Details:
 - ML Score: {destination['overall_score']:.3f}
 
 Write a compelling 2-3 sentence explanation of why this is a perfect match."""
+    
+    def _section_header(self, number: int, destination: Dict) -> str:
+        return f"### {number}. {destination['destination']}, {destination['country']}"
+    
+    def _section_instructions(self, destinations: List[Dict]) -> str:
+        return (f"Answer with one section per destination, in the order given, starting each section with "
+                f"its header line exactly as written above (for example \"{self._section_header(1, destinations[0])}\").")
+    
+    def _batch_itinerary_prompt(self, user_prefs: Dict, destinations: List[Dict],
+                                attractions: List[List[Dict]]) -> str:
+        destination_blocks = "\n\n".join(
+            f"""{self._section_header(number, destination)}
+- Top Attractions: {", ".join([attr['name'] for attr in destination_attractions[:3]])}"""
+            for number, (destination, destination_attractions) in enumerate(zip(destinations, attractions), 1)
+        )
+        
+        return f"""Create a {user_prefs.get('duration', 7)}-day travel itinerary for each of these destinations.
+
+Trip Details:
+- Budget: ${user_prefs.get('budget', 100)}/day
+- Trip Type: {user_prefs.get('trip_type', 'culture')}
+- Season: {user_prefs.get('season', 'spring')}
+
+Destinations:
+
+{destination_blocks}
+
+For each destination, create a day-by-day itinerary with morning, afternoon, and evening activities. Keep it practical and budget-conscious.
+{self._section_instructions(destinations)}"""
+    
+    def _batch_explanation_prompt(self, user_prefs: Dict, destinations: List[Dict]) -> str:
+        destination_blocks = "\n\n".join(
+            f"""{self._section_header(number, destination)}
+- Cost: ${destination['cost_per_day']}/day
+- Trip Type: {destination['trip_type']}
+- Best Season: {destination['best_season']}
+- ML Score: {destination['overall_score']:.3f}"""
+            for number, destination in enumerate(destinations, 1)
+        )
+        
+        return f"""Explain why each of these destinations is an excellent choice for this traveler:
+
+Traveler Profile:
+- Budget: ${user_prefs.get('budget', 100)}/day
+- Duration: {user_prefs.get('duration', 7)} days
+- Interests: {user_prefs.get('trip_type', 'culture')} travel
+- Season: {user_prefs.get('season', 'spring')}
+
+Destinations:
+
+{destination_blocks}
 
-        return self.llm_engine.generate_text(prompt, max_tokens=200)
+For each destination, write a compelling 2-3 sentence explanation of why it is a perfect match.
+{self._section_instructions(destinations)}"""
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List
+
+
+# z-score of the 95th percentile of a standard normal
+Z_95 = 1.6448536269514722
+
+BATCH_HEADER = re.compile(r'^### \d+\. .+$', re.MULTILINE)
+TRIP_LENGTH = re.compile(r'(\d+)-day')
+
+DAY_THEMES = ['Arrival and City Center', 'Cultural Exploration', 'Nature and Relaxation', 'Markets and Neighborhoods',
+              'Day Trip', 'Food and Local Life', 'Hidden Corners', 'Museums and History', 'Slow Morning, Big Views']
+MORNING = ['Walk the old town before the crowds', 'Visit the main museum', 'Take a guided heritage tour',
+           'Hike to a nearby viewpoint', 'Browse the morning market', 'Join a cooking class']
+AFTERNOON = ['Explore local neighborhoods on foot', 'Relax at a park or beach', 'Tour a historic landmark',
+             'Take a boat or bus excursion', 'Visit a gallery and a cafe', 'Shop for local crafts']
+EVENING = ['Dinner at a family-run restaurant', 'Sunset from a scenic lookout', 'Catch a live music show',
+           'Try street food at the night market', 'Stroll the waterfront', 'Evening cultural performance']
+
+EXPLANATION_OPENERS = ['This destination fits your budget comfortably', 'This trip lines up with your travel season',
+                       'This pick matches the kind of travel you enjoy', 'This destination rewards your trip length']
+EXPLANATION_DETAILS = ['with a strong mix of history and local culture', 'with plenty to see within a short radius',
+                       'with good safety ratings and easy logistics', 'with memorable food and friendly neighborhoods']
+EXPLANATION_CLOSERS = ['It is an easy recommendation for your travel style.',
+                       'It should feel unhurried without wasting a day.',
+                       'It balances value and experience well.',
+                       'It is a well-rounded choice for this season.']
+
+ATTRACTION_NAMES = ['Old Town Square', 'National Museum', 'Botanical Garden', 'Cathedral', 'Harbour Walk',
+                    'Central Market', 'Fortress Ruins', 'Art Gallery', 'Riverside Park', 'Historic Quarter']
+ATTRACTION_CATEGORIES = ['historic', 'museums', 'natural', 'cultural']
+
+
+class MockProviderError(Exception):
+    """Injected failure from the mock provider, standing in for a 5xx from a real API."""
+
+
+class MockProvider:
+    """
+    Offline, seeded stand-in for the LLM and travel-data APIs, for load testing.
+
+    Every call waits for a sampled latency and fails with probability error_rate;
+    LLM calls additionally take one second per tokens_per_second output tokens.
+    Latency distributions ('constant', 'uniform' or 'lognormal') are described by
+    their median and p95 in seconds.
+
+    Output depends only on seed and the request, so identical prompts get identical
+    text and cache hit rates behave as they would against a real provider. Latency
+    and failures are drawn from seed, the request and how many times that request
+    has been made, so a run is reproducible whatever order concurrent calls land in.
+    Attempt counts are kept for the max_tracked_requests most recent requests only.
+    """
+
+    def __init__(self, seed: int = 0, latency: str = 'lognormal', latency_median: float = 0.3,
+                 latency_p95: float = 1.0, error_rate: float = 0.0, tokens_per_second: float = 50.0,
+                 max_tracked_requests: int = 100000):
+        if latency not in ('constant', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {latency}")
+        if latency_p95 < latency_median:
+            raise ValueError("latency_p95 must be at least latency_median")
+
+        self.seed = seed
+        self.latency = latency
+        self.latency_median = latency_median
+        self.latency_p95 = latency_p95
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        self.max_tracked_requests = max_tracked_requests
+
+        self.calls = 0
+        self.errors = 0
+        self.tokens = 0
+        self.simulated_seconds = 0.0
+        self._attempts = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'MockProvider':
+        """Mock configured by the TRIPX_MOCK_* environment variables."""
+        return cls(
+            seed=int(os.getenv('TRIPX_MOCK_SEED', 0)),
+            latency=os.getenv('TRIPX_MOCK_LATENCY', 'lognormal'),
+            latency_median=float(os.getenv('TRIPX_MOCK_LATENCY_MEDIAN', 0.3)),
+            latency_p95=float(os.getenv('TRIPX_MOCK_LATENCY_P95', 1.0)),
+            error_rate=float(os.getenv('TRIPX_MOCK_ERROR_RATE', 0.0)),
+            tokens_per_second=float(os.getenv('TRIPX_MOCK_TOKENS_PER_SECOND', 50.0))
+        )
+
+    async def acomplete(self, prompt: str, max_tokens: int = 500) -> str:
+        text = self.generate_text(prompt, max_tokens)
+        tokens = len(text.split())
+        await self._simulate_call('llm', [prompt, max_tokens], tokens / self.tokens_per_second, tokens)
+        return text
+
+    async def astream(self, prompt: str, max_tokens: int = 500) -> AsyncIterator[str]:
+        """Words of the completion, each after its share of the token throughput."""
+        words = self.generate_text(prompt, max_tokens).split(' ')
+        await self._simulate_call('llm', [prompt, max_tokens], 0.0, len(words))
+
+        for position, word in enumerate(words):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield word if position == 0 else ' ' + word
+
+    async def aweather(self, latitude: float, longitude: float) -> Dict:
+        """Seven-day forecast in the shape FreeAPIIntegrator returns for Open-Meteo."""
+        await self._simulate_call('weather', [round(latitude, 2), round(longitude, 2)])
+        rng = self._rng('weather', round(latitude, 2), round(longitude, 2))
+
+        # Warmer towards the equator
+        base = 28 - 0.35 * abs(latitude)
+        highs = [round(base + rng.uniform(-3, 5), 1) for _ in range(7)]
+        return {
+            'current_temp': round(base + rng.uniform(-4, 4), 1),
+            'weather_code': rng.choice([0, 1, 2, 3, 61]),
+            'daily_forecast': {
+                'temperature_2m_max': highs,
+                'temperature_2m_min': [round(high - rng.uniform(5, 11), 1) for high in highs],
+                'precipitation_sum': [round(max(0.0, rng.gauss(1, 3)), 1) for _ in range(7)]
+            },
+            'status': 'success'
+        }
+
+    async def aattractions(self, latitude: float, longitude: float, radius: int = 5000) -> List[Dict]:
+        await self._simulate_call('attractions', [round(latitude, 3), round(longitude, 3), radius])
+        rng = self._rng('attractions', round(latitude, 3), round(longitude, 3), radius)
+
+        return [
+            {'name': name, 'category': rng.choice(ATTRACTION_CATEGORIES),
+             'distance': rng.randrange(min(100, radius // 2), max(radius, 1))}
+            for name in rng.sample(ATTRACTION_NAMES, 5)
+        ]
+
+    def generate_text(self, prompt: str, max_tokens: int = 500) -> str:
+        """Deterministic completion for prompt, answering each section of a batched prompt."""
+        headers = list(dict.fromkeys(BATCH_HEADER.findall(prompt)))
+        if headers:
+            instructions = BATCH_HEADER.sub('', prompt)
+            text = "\n\n".join(f"{header}\n{self._section_text(instructions, header)}" for header in headers)
+        else:
+            text = self._section_text(prompt, '')
+
+        words = text.split(' ')
+        return text if len(words) <= max_tokens else ' '.join(words[:max_tokens])
+
+    def sample_latency(self, rng: random.Random) -> float:
+        if self.latency == 'constant':
+            return self.latency_median
+        if self.latency == 'uniform':
+            # Symmetric around the median, wide enough that 95% of draws fall below p95
+            half_width = (self.latency_p95 - self.latency_median) / 0.9
+            return max(0.0, rng.uniform(self.latency_median - half_width, self.latency_median + half_width))
+        if self.latency_median <= 0:
+            return 0.0
+        sigma = math.log(self.latency_p95 / self.latency_median) / Z_95
+        return rng.lognormvariate(math.log(self.latency_median), sigma)
+
+    def stats(self) -> Dict:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'tokens': self.tokens,
+            'simulated_seconds': round(self.simulated_seconds, 3)
+        }
+
+    async def _simulate_call(self, kind: str, request: List, extra_seconds: float = 0.0, tokens: int = 0):
+        """Sleep for the call's sampled latency, then fail it if its draw falls under error_rate."""
+        request_key = json.dumps([kind] + request, default=str)
+        with self._lock:
+            attempt = self._attempts.pop(request_key, 0)
+            self._attempts[request_key] = attempt + 1
+            # Long load tests make endless distinct requests; forget the least recent ones
+            while len(self._attempts) > self.max_tracked_requests:
+                self._attempts.popitem(last=False)
+
+        rng = self._rng('call', request_key, attempt)
+        seconds = self.sample_latency(rng) + extra_seconds
+        failed = rng.random() < self.error_rate
+
+        with self._lock:
+            self.calls += 1
+            self.simulated_seconds += seconds
+            if failed:
+                self.errors += 1
+            else:
+                self.tokens += tokens
+
+        await asyncio.sleep(seconds)
+
+        if failed:
+            raise MockProviderError(f"Mock {kind} API error: 503")
+
+    def _rng(self, *parts) -> random.Random:
+        # Seeded from a digest rather than hash(), which is randomized per process for strings
+        digest = hashlib.sha256(json.dumps([self.seed] + list(parts), default=str).encode('utf-8')).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+
+    def _section_text(self, prompt: str, salt: str) -> str:
+        rng = self._rng('text', prompt, salt)
+        lowered = prompt.lower()
+
+        if 'itinerary' in lowered:
+            match = TRIP_LENGTH.search(prompt)
+            days = min(int(match.group(1)), 7) if match else 3
+            themes = rng.sample(DAY_THEMES, days)
+            return "\n\n".join(
+                f"Day {day}: {themes[day - 1]}\n"
+                f"- Morning: {rng.choice(MORNING)}\n"
+                f"- Afternoon: {rng.choice(AFTERNOON)}\n"
+                f"- Evening: {rng.choice(EVENING)}"
+                for day in range(1, days + 1)
+            )
+
+        if 'explain' in lowered:
+            return (f"{rng.choice(EXPLANATION_OPENERS)}, {rng.choice(EXPLANATION_DETAILS)}. "
+                    f"{rng.choice(EXPLANATION_CLOSERS)}")
+
+        return f"Mock response {rng.getrandbits(32):08x} from the offline provider."
+
+
+_mock_provider = None
+_mock_provider_lock = threading.Lock()
+
+
+def get_mock_provider() -> MockProvider:
+    """Process-wide mock from the TRIPX_MOCK_* settings, shared by every engine selecting provider='mock'."""
+    global _mock_provider
+
+    with _mock_provider_lock:
+        if _mock_provider is None:
+            _mock_provider = MockProvider.from_env()
+
+    return _mock_provider
@@ -1,11 +1,168 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+import json
+import os
+from typing import Dict, List, Tuple, Optional, Union
+from geocoding import GEO_PRECISIONS, get_gazetteer
+from snapshot import (SnapshotWriter, column_spec, load_catalog_snapshot, merge_column_specs, snapshot_is_current,
+                      snapshot_key, snapshot_path, write_catalog_snapshot)
+
+
+class DestinationIndex:
+    """
+    Load-time index over a DestinationStore for the recommender's hard filters.
+    
+    Rows are kept sorted by avg_cost_per_day so a budget cap is a binary search, and
+    rows are grouped by their distinct [min_days, max_days] interval so a duration
+    query only touches the intervals, then the matching rows.
+    
+    Given the index of a previous store version, each part whose input arrays are the
+    very same objects in both versions is reused instead of being sorted again.
+    """
+    
+    def __init__(self, costs: np.ndarray, min_days: np.ndarray, max_days: np.ndarray,
+                 previous: Optional['DestinationIndex'] = None):
+        self.costs = costs
+        self.min_days = min_days
+        self.max_days = max_days
+        
+        if previous is not None and previous.costs is costs:
+            self.cost_order = previous.cost_order
+            self.sorted_costs = previous.sorted_costs
+        else:
+            self.cost_order = np.argsort(costs, kind='stable')
+            self.sorted_costs = costs[self.cost_order]
+        
+        if previous is not None and previous.min_days is min_days and previous.max_days is max_days:
+            self.interval_members = previous.interval_members
+            self.interval_min_days = previous.interval_min_days
+            self.interval_max_days = previous.interval_max_days
+            self.interval_offsets = previous.interval_offsets
+        else:
+            self._group_intervals(min_days, max_days)
+        
+        for values in (self.cost_order, self.sorted_costs, self.interval_min_days, self.interval_max_days,
+                       self.interval_members, self.interval_offsets):
+            values.setflags(write=False)
+        
+        self.size = len(costs)
+    
+    def _group_intervals(self, min_days: np.ndarray, max_days: np.ndarray):
+        # One stable sort by (min_days, max_days); each run of equal intervals is a group
+        self.interval_members = np.lexsort((max_days, min_days))
+        sorted_min_days = min_days[self.interval_members]
+        sorted_max_days = max_days[self.interval_members]
+        
+        boundaries = (sorted_min_days[1:] != sorted_min_days[:-1]) | (sorted_max_days[1:] != sorted_max_days[:-1])
+        starts = np.flatnonzero(np.concatenate([[True], boundaries])) if len(min_days) else np.empty(0, dtype=np.intp)
+        
+        self.interval_min_days = sorted_min_days[starts]
+        self.interval_max_days = sorted_max_days[starts]
+        self.interval_offsets = np.append(starts, len(min_days))
+    
+    def within_budget(self, max_cost: float) -> np.ndarray:
+        """Positions with cost <= max_cost, in ascending cost order."""
+        return self.cost_order[:np.searchsorted(self.sorted_costs, max_cost, side='right')]
+    
+    def duration_matches(self, user_days: int, max_distance: Optional[int]) -> np.ndarray:
+        """Positions whose [min_days, max_days] lies within max_distance days of user_days (None = any)."""
+        if max_distance is None:
+            return np.arange(self.size)
+        if max_distance < 0:
+            return np.empty(0, dtype=np.intp)
+        
+        hits = np.flatnonzero((self.interval_min_days - max_distance <= user_days) &
+                              (user_days <= self.interval_max_days + max_distance))
+        if len(hits) == 0:
+            return np.empty(0, dtype=np.intp)
+        
+        return np.concatenate([
+            self.interval_members[self.interval_offsets[g]:self.interval_offsets[g + 1]] for g in hits
+        ])
+
+
+class DestinationStore:
+    """
+    Immutable columnar view of the processed catalog used by the recommender.
+    
+    Numeric columns are contiguous typed arrays; categorical columns are stored
+    as small integer codes into a per-column vocabulary, where a missing value is
+    the vocabulary entry None. Each (destination, country) key must be unique: the store
+    maps keys to row positions, which is how catalog updates find their rows.
+    """
+    
+    key_columns = ['destination', 'country']
+    numeric_columns = ['avg_cost_per_day', 'min_days', 'max_days', 'popularity_score',
+                       'safety_score', 'quality_score', 'quality_score_norm', 'latitude', 'longitude']
+    text_columns = ['destination', 'country', 'region']
+    categorical_columns = ['trip_type', 'season_best']
+    
+    def __init__(self, columns: Dict[str, np.ndarray], vocabularies: Dict[str, List[str]],
+                 previous: Optional['DestinationStore'] = None):
+        self.columns = {}
+        for name, values in columns.items():
+            if previous is None or previous.columns.get(name) is not values:
+                values = np.ascontiguousarray(values)
+                values.setflags(write=False)
+            self.columns[name] = values
+        
+        self.vocabularies = {name: list(vocab) for name, vocab in vocabularies.items()}
+        self._code_lookup = {
+            name: {value: code for code, value in enumerate(vocab)}
+            for name, vocab in self.vocabularies.items()
+        }
+        self.size = len(next(iter(self.columns.values()))) if self.columns else 0
+        
+        self.index = DestinationIndex(self.columns['avg_cost_per_day'], self.columns['min_days'],
+                                      self.columns['max_days'], previous.index if previous is not None else None)
+        
+        key_arrays = [self.columns[name] for name in self.key_columns]
+        if previous is not None and all(previous.columns[name] is values
+                                        for name, values in zip(self.key_columns, key_arrays)):
+            self.key_positions = previous.key_positions
+        else:
+            self.key_positions = self._map_keys(key_arrays)
+    
+    def _map_keys(self, key_arrays: List[np.ndarray]) -> Dict[Tuple, int]:
+        key_positions = {key: position for position, key in enumerate(zip(*key_arrays))}
+        if len(key_positions) != self.size:
+            keys = pd.DataFrame(dict(zip(self.key_columns, key_arrays)))
+            duplicates = keys[keys.duplicated()].drop_duplicates().head(5)
+            raise ValueError(f"Catalog has duplicate {tuple(self.key_columns)} keys, e.g. "
+                             f"{list(duplicates.itertuples(index=False, name=None))}")
+        return key_positions
+    
+    def positions_of(self, keys) -> np.ndarray:
+        """Row position of each (destination, country) key, -1 where it is absent."""
+        return np.array([self.key_positions.get(key, -1) for key in keys], dtype=np.intp)
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+    
+    def encode(self, column: str, value: str) -> int:
+        """Category code for a value, or -1 when the value never appears in the vocabulary."""
+        return self._code_lookup[column].get(value, -1)
+    
+    def decode(self, column: str, code: int) -> str:
+        return self.vocabularies[column][code]
+    
+    def row(self, position: int) -> Dict:
+        """Materialize one destination as a dict of plain Python values."""
+        record = {name: self.columns[name][position].item() for name in self.numeric_columns}
+        for name in self.text_columns:
+            record[name] = self.columns[name][position]
+        for name in self.categorical_columns:
+            record[name] = self.decode(name, self.columns[f'{name}_code'][position])
+        return record
 
 
 class TripXPreprocessor:
     
-    def __init__(self):
+    def __init__(self, compatibility_config: Optional[Union[str, Dict]] = None,
+                 fuzzy_geocoding: Optional[bool] = None):
         # Cost categories for budget classification
         self.cost_categories = {
             'budget': (0, 60),
@@ -22,6 +179,61 @@ class TripXPreprocessor:
             'popularity': 0.6,
             'safety': 0.4
         }
+        
+        # Min-max scaled into *_norm columns; norm_stats keeps the bounds last used
+        self.normalized_features = ['avg_cost_per_day', 'popularity_score', 'safety_score',
+                                    'quality_score', 'min_days', 'max_days']
+        self.norm_stats = {}
+        
+        # Offline gazetteer used to precompute each destination's coordinates. Fuzzy matching of
+        # unknown names (default: on unless TRIPX_GEO_FUZZY=0) dominates preprocessing of large feeds
+        self.gazetteer = get_gazetteer()
+        if fuzzy_geocoding is None:
+            fuzzy_geocoding = os.getenv('TRIPX_GEO_FUZZY', '1') != '0'
+        self.fuzzy_geocoding = fuzzy_geocoding
+        
+        # Compatibility between a user's preference and a destination's category
+        self.compatibility_tables = {
+            'trip_type': {
+                'match_score': 1.0,
+                'compatible_score': 0.6,
+                'default_score': 0.2,
+                'compatible': {
+                    'culture': ['urban', 'nature'],
+                    'beach': ['nature', 'luxury'],
+                    'urban': ['culture', 'luxury'],
+                    'luxury': ['beach', 'urban'],
+                    'nature': ['beach', 'culture']
+                },
+                'overrides': {}
+            },
+            'season_best': {
+                'match_score': 1.0,
+                'compatible_score': 0.6,
+                'default_score': 0.3,
+                'compatible': {
+                    'spring': ['summer', 'fall'],
+                    'summer': ['spring', 'dry_season'],
+                    'fall': ['spring', 'winter'],
+                    'winter': ['fall', 'cool_season'],
+                    'dry_season': ['summer', 'spring'],
+                    'cool_season': ['winter', 'fall']
+                },
+                'overrides': {}
+            }
+        }
+        self._compatibility_matrices = {}
+        self._compatibility_rows = {}
+        
+        # Bumped whenever the tables change so downstream caches can tell
+        self.config_version = 0
+        
+        if compatibility_config is not None:
+            self.load_compatibility_config(compatibility_config)
+        
+        # Columnar store for the most recently processed catalog
+        self.destination_store = None
+        self._store_source = None
     
     def categorize_cost(self, cost: float) -> str:
         for category, (min_cost, max_cost) in self.cost_categories.items():
@@ -47,24 +259,100 @@ class TripXPreprocessor:
         else:
             return 0.2
     
+    def max_duration_distance(self, min_score: float) -> Optional[int]:
+        """Largest days-outside-range that still scores >= min_score in calculate_duration_compatibility."""
+        if min_score <= 0.2:
+            return None
+        if min_score <= 0.5:
+            return 3
+        if min_score <= 0.8:
+            return 1
+        if min_score <= 1.0:
+            return 0
+        return -1
+    
+    def calculate_duration_compatibility_vectorized(self, user_days: int, min_days: np.ndarray,
+                                                    max_days: np.ndarray) -> np.ndarray:
+        # Same tiers as calculate_duration_compatibility, for whole columns at once
+        distance = np.where(user_days < min_days, min_days - user_days, user_days - max_days)
+        return np.select(
+            [(min_days <= user_days) & (user_days <= max_days), distance == 1, distance <= 3],
+            [1.0, 0.8, 0.5],
+            default=0.2
+        )
+    
     def calculate_season_match(self, user_season: str, dest_season: str) -> float:
-        # Exact season match
-        if user_season == dest_season:
-            return 1.0
+        return self.compatibility_score('season_best', user_season, dest_season)
+    
+    def calculate_season_match_vectorized(self, user_season: str, season_codes: np.ndarray,
+                                          season_vocab: List[str]) -> np.ndarray:
+        return self.compatibility_row('season_best', user_season, season_vocab)[season_codes]
+    
+    def load_compatibility_config(self, config: Union[str, Dict]):
+        """Override compatibility tables from a dict or a JSON file path, keyed by column name."""
+        if isinstance(config, str):
+            with open(config) as f:
+                config = json.load(f)
         
-        season_similarity = {
-            'spring': ['summer', 'fall'],
-            'summer': ['spring', 'dry_season'],
-            'fall': ['spring', 'winter'],
-            'winter': ['fall', 'cool_season'],
-            'dry_season': ['summer', 'spring'],
-            'cool_season': ['winter', 'fall']
-        }
+        for column, settings in config.items():
+            if column not in self.compatibility_tables:
+                raise ValueError(f"Unknown compatibility table: {column}")
+            
+            table = self.compatibility_tables[column]
+            for key, value in settings.items():
+                if key not in table:
+                    raise ValueError(f"Unknown setting '{key}' for compatibility table {column}")
+                table[key] = float(value) if key.endswith('_score') else value
+        
+        self._compatibility_matrices.clear()
+        self._compatibility_rows.clear()
+        self.config_version += 1
+    
+    def compatibility_score(self, column: str, user_value: str, dest_value: str) -> float:
+        table = self.compatibility_tables[column]
+        
+        override = table['overrides'].get(user_value, {}).get(dest_value)
+        if override is not None:
+            return float(override)
+        
+        # Exact match
+        if user_value == dest_value:
+            return table['match_score']
+        
+        if dest_value in table['compatible'].get(user_value, []):
+            return table['compatible_score']
         
-        if dest_season in season_similarity.get(user_season, []):
-            return 0.6
+        return table['default_score']
+    
+    def compatibility_matrix(self, column: str, vocab: List[str]) -> np.ndarray:
+        """Score matrix indexed by [user category code, destination category code]."""
+        key = (column, tuple(vocab))
+        matrix = self._compatibility_matrices.get(key)
+        
+        if matrix is None:
+            matrix = np.array([
+                [self.compatibility_score(column, user_value, dest_value) for dest_value in vocab]
+                for user_value in vocab
+            ], dtype=np.float64).reshape(len(vocab), len(vocab))
+            matrix.setflags(write=False)
+            self._compatibility_matrices[key] = matrix
         
-        return 0.3
+        return matrix
+    
+    def compatibility_row(self, column: str, user_value: str, vocab: List[str]) -> np.ndarray:
+        """Scores of one user preference against every category code in vocab."""
+        if user_value in vocab:
+            return self.compatibility_matrix(column, vocab)[vocab.index(user_value)]
+        
+        # Preferences never seen in the catalog still honour overrides and compatible lists
+        key = (column, user_value, tuple(vocab))
+        row = self._compatibility_rows.get(key)
+        if row is None:
+            row = np.array([self.compatibility_score(column, user_value, v) for v in vocab], dtype=np.float64)
+            row.setflags(write=False)
+            self._compatibility_rows[key] = row
+        
+        return row
     
     def calculate_quality_score(self, popularity: float, safety: float) -> float:
         return (popularity * self.quality_weights['popularity'] + 
@@ -76,41 +364,226 @@ class TripXPreprocessor:
             encoding[f'type_{trip_type}'] = 1
         return encoding
     
-    def normalize_numerical_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def compute_norm_stats(self, df: pd.DataFrame) -> Dict[str, Tuple]:
+        """(min, max) of each normalized feature present in df."""
+        return {feature: (df[feature].min(), df[feature].max())
+                for feature in self.normalized_features if feature in df.columns}
+    
+    def merge_norm_stats(self, stats: Dict[str, Tuple], other: Dict[str, Tuple]) -> Dict[str, Tuple]:
+        merged = dict(stats)
+        for feature, (min_val, max_val) in other.items():
+            if feature in merged:
+                merged[feature] = (min(merged[feature][0], min_val), max(merged[feature][1], max_val))
+            else:
+                merged[feature] = (min_val, max_val)
+        return merged
+    
+    def normalize_numerical_features(self, df: pd.DataFrame,
+                                     norm_stats: Optional[Dict[str, Tuple]] = None) -> pd.DataFrame:
+        """
+        Min-max scale the numerical features into *_norm columns.
+        
+        The bounds come from df itself unless norm_stats gives them, which lets a catalog
+        be normalized chunk by chunk against its global minimum and maximum.
+        """
         df_normalized = df.copy()
         
-        numerical_features = ['avg_cost_per_day', 'popularity_score', 'safety_score', 
-                            'quality_score', 'min_days', 'max_days']
+        if norm_stats is None:
+            norm_stats = self.compute_norm_stats(df_normalized)
+        self.norm_stats = norm_stats
         
-        for feature in numerical_features:
+        for feature in self.normalized_features:
             if feature in df_normalized.columns:
-                min_val = df_normalized[feature].min()
-                max_val = df_normalized[feature].max()
-                df_normalized[f'{feature}_norm'] = (df_normalized[feature] - min_val) / (max_val - min_val)
+                df_normalized[f'{feature}_norm'] = self.normalize_feature(df_normalized[feature], norm_stats[feature])
         
         return df_normalized
     
-    def preprocess_destinations(self, df: pd.DataFrame) -> pd.DataFrame:
-        processed_df = df.copy()
+    def normalize_feature(self, values: pd.Series, bounds: Tuple) -> pd.Series:
+        min_val, max_val = bounds
+        return (values - min_val) / (max_val - min_val)
+    
+    def derived_columns(self) -> List[str]:
+        """Columns preprocess_destinations adds on top of the source catalog."""
+        return (['cost_category', 'quality_score'] + [f'type_{t}' for t in self.trip_types] +
+                ['duration_range', 'duration_flexibility', 'latitude', 'longitude', 'geo_precision'] + [f'{f}_norm' for f in self.normalized_features])
+    
+    def categorize_cost_vectorized(self, costs: np.ndarray) -> np.ndarray:
+        """categorize_cost for a whole column: first matching bin wins, anything unmatched is luxury."""
+        costs = np.asarray(costs)
+        conditions = [(min_cost <= costs) & (costs < max_cost)
+                      for min_cost, max_cost in self.cost_categories.values()]
+        return np.select(conditions, list(self.cost_categories.keys()), default='luxury')
+    
+    def engineer_features(self, df: pd.DataFrame, coordinates: bool = True) -> pd.DataFrame:
+        """
+        Features that depend only on each row: cost category, quality, trip type flags, duration, coordinates.
         
-        processed_df['cost_category'] = processed_df['avg_cost_per_day'].apply(self.categorize_cost)
+        coordinates=False skips geocoding (latitude, longitude and geo_precision are left out).
+        """
+        processed_df = df.copy()
         
-        processed_df['quality_score'] = processed_df.apply(
-            lambda row: self.calculate_quality_score(row['popularity_score'], row['safety_score']), 
-            axis=1
+        processed_df['cost_category'] = pd.Series(
+            self.categorize_cost_vectorized(processed_df['avg_cost_per_day'].to_numpy()),
+            index=processed_df.index
         )
         
-        trip_type_encoded = processed_df['trip_type'].apply(self.encode_trip_type)
-        trip_type_df = pd.DataFrame(trip_type_encoded.tolist(), index=processed_df.index)
+        processed_df['quality_score'] = (processed_df['popularity_score'] * self.quality_weights['popularity'] +
+                                         processed_df['safety_score'] * self.quality_weights['safety'])
+        
+        trip_types = processed_df['trip_type']
+        trip_type_df = pd.DataFrame({f'type_{t}': (trip_types == t).astype('int64') for t in self.trip_types},
+                                    index=processed_df.index)
         processed_df = pd.concat([processed_df, trip_type_df], axis=1)
         
         processed_df['duration_range'] = processed_df['max_days'] - processed_df['min_days']
         processed_df['duration_flexibility'] = processed_df['duration_range'] / processed_df['max_days']
         
+        if not coordinates:
+            return processed_df
+        
+        # Resolved once here so enrichment never geocodes per request; NaN unless a city matched
+        latitudes, longitudes, precisions = self.gazetteer.resolve(processed_df['destination'], processed_df['country'],
+                                                                   fuzzy=self.fuzzy_geocoding)
+        processed_df['latitude'] = pd.Series(latitudes, index=processed_df.index)
+        processed_df['longitude'] = pd.Series(longitudes, index=processed_df.index)
+        processed_df['geo_precision'] = pd.Series(precisions, index=processed_df.index, dtype='str')
+        
+        return processed_df
+    
+    def preprocess_destinations(self, df: pd.DataFrame) -> pd.DataFrame:
+        processed_df = self.engineer_features(df)
         processed_df = self.normalize_numerical_features(processed_df)
         
+        self.get_destination_store(processed_df)
+        
         return processed_df
     
+    def scan_catalog(self, data_path: str, chunksize: int) -> Dict:
+        """
+        First pass of streaming ingestion: row count, source column count, global
+        normalization bounds and the storage spec of every output column.
+        
+        Nothing here depends on coordinates and their column specs are fixed, so chunks
+        are not geocoded until the second pass.
+        """
+        rows = 0
+        source_columns = 0
+        norm_stats = {}
+        specs = {}
+        
+        for chunk in pd.read_csv(data_path, chunksize=chunksize):
+            engineered = self.engineer_features(chunk, coordinates=False)
+            
+            rows += len(chunk)
+            source_columns = chunk.shape[1]
+            norm_stats = self.merge_norm_stats(norm_stats, self.compute_norm_stats(engineered))
+            
+            for name in engineered.columns:
+                spec = column_spec(name, engineered[name])
+                specs[name] = merge_column_specs(specs[name], spec) if name in specs else spec
+        
+        for name in ('latitude', 'longitude'):
+            specs[name] = column_spec(name, pd.Series([], dtype='float64'))
+        specs['geo_precision'] = column_spec('geo_precision', pd.Series(GEO_PRECISIONS, dtype='str'))
+        
+        for feature in self.normalized_features:
+            if feature in norm_stats:
+                name = f'{feature}_norm'
+                specs[name] = {'name': name, 'kind': 'numeric', 'dtype': np.dtype(np.float64).str,
+                               'pandas_dtype': 'float64'}
+        
+        return {'rows': rows, 'source_columns': source_columns, 'norm_stats': norm_stats,
+                'specs': list(specs.values())}
+    
+    def preprocess_to_snapshot(self, data_path: str, path: str, key: str, chunksize: int = 100000) -> Dict:
+        """
+        Preprocess a catalog too large to load at once straight into a snapshot at path.
+        
+        Two passes over chunks of the CSV: scan_catalog collects the global statistics,
+        then each chunk is transformed against them and appended to the snapshot files,
+        so peak memory stays proportional to chunksize. The result is the same snapshot
+        write_catalog_snapshot would produce for the whole catalog.
+        """
+        scan = self.scan_catalog(data_path, chunksize)
+        
+        writer = SnapshotWriter(path, key, scan['rows'], scan['specs'], scan['source_columns'])
+        try:
+            for chunk in pd.read_csv(data_path, chunksize=chunksize):
+                writer.write(self.normalize_numerical_features(self.engineer_features(chunk), scan['norm_stats']))
+        except Exception:
+            writer.abort()
+            raise
+        writer.close()
+        
+        return scan
+    
+    def build_destination_store(self, processed_df: pd.DataFrame, previous: Optional[DestinationStore] = None,
+                                changed_columns: Optional[List[str]] = None) -> DestinationStore:
+        """
+        Columnar store for processed_df.
+        
+        When processed_df only differs from the frame behind previous in the values of
+        changed_columns (same rows in the same order), every other column, the key map and
+        the index parts over unchanged columns are taken over from previous.
+        """
+        if previous is None or changed_columns is None or len(previous) != len(processed_df):
+            previous, changed_columns = None, None
+        
+        def unchanged(name: str) -> bool:
+            return previous is not None and name not in changed_columns
+        
+        columns = {}
+        
+        for name in DestinationStore.numeric_columns:
+            columns[name] = previous[name] if unchanged(name) else processed_df[name].to_numpy()
+        
+        for name in DestinationStore.text_columns:
+            columns[name] = previous[name] if unchanged(name) else processed_df[name].to_numpy(dtype=object)
+        
+        known_categories = {'trip_type': self.trip_types, 'season_best': self.seasons}
+        vocabularies = {}
+        for name in DestinationStore.categorical_columns:
+            if unchanged(name):
+                columns[f'{name}_code'] = previous[f'{name}_code']
+                vocabularies[name] = previous.vocabularies[name]
+                continue
+            
+            values = processed_df[name]
+            extra = sorted(set(values.dropna().unique()) - set(known_categories[name]))
+            vocab = list(known_categories[name]) + extra
+            codes = pd.Categorical(values, categories=vocab).codes
+            
+            # Missing values get a trailing None entry, which only ever scores the default
+            missing = codes < 0
+            if missing.any():
+                vocab.append(None)
+                codes = np.where(missing, len(vocab) - 1, codes)
+            
+            columns[f'{name}_code'] = codes.astype(np.min_scalar_type(len(vocab)))
+            vocabularies[name] = vocab
+        
+        return DestinationStore(columns, vocabularies, previous)
+    
+    def get_destination_store(self, processed_df: pd.DataFrame, previous: Optional[DestinationStore] = None,
+                              changed_columns: Optional[List[str]] = None) -> DestinationStore:
+        """Return the store for processed_df, building it only if it is not the one already cached."""
+        if self._store_source is not processed_df:
+            self.destination_store = self.build_destination_store(processed_df, previous, changed_columns)
+            self._store_source = processed_df
+        return self.destination_store
+    
+    def config_state(self) -> Dict:
+        """Settings that affect preprocess_destinations, used to key catalog snapshots."""
+        return {
+            'cost_categories': self.cost_categories,
+            'trip_types': self.trip_types,
+            'seasons': self.seasons,
+            'quality_weights': self.quality_weights,
+            'normalized_features': self.normalized_features,
+            'gazetteer': self.gazetteer.digest,
+            'fuzzy_geocoding': self.fuzzy_geocoding
+        }
+    
     def create_user_profile_features(self, budget: float, duration: int, 
                                    trip_type: str, season: str) -> Dict:
         user_features = {
@@ -127,9 +600,68 @@ class TripXPreprocessor:
         return user_features
 
 
-def load_and_preprocess_data(data_path: str = '../data/raw/dest.csv') -> Tuple[pd.DataFrame, TripXPreprocessor]:
+def ingest_catalog(data_path: str, snapshot_dir: str, chunksize: int = 100000,
+                   compatibility_config: Optional[Union[str, Dict]] = None,
+                   fuzzy_geocoding: Optional[bool] = None) -> str:
+    """
+    Stream the catalog at data_path into its binary snapshot under snapshot_dir.
+    
+    Nothing is loaded: peak memory stays proportional to chunksize however large the
+    CSV is, and a snapshot that is already current is left alone. Returns the snapshot
+    path, which load_and_preprocess_data(data_path, snapshot_dir=snapshot_dir) then maps.
+    fuzzy_geocoding=False geocodes exact city names only, for large feeds; it is part of
+    the snapshot key, so the loader needs the same setting (or TRIPX_GEO_FUZZY=0).
+    """
+    preprocessor = TripXPreprocessor(compatibility_config, fuzzy_geocoding)
+    path = snapshot_path(snapshot_dir, data_path)
+    _ingest_if_stale(preprocessor, data_path, path, snapshot_key(data_path, preprocessor.config_state()), chunksize)
+    return path
+
+
+def _ingest_if_stale(preprocessor: TripXPreprocessor, data_path: str, path: str, key: str, chunksize: int):
+    if not snapshot_is_current(path, key):
+        print(f"Streaming {data_path} into catalog snapshot {path} ({chunksize} rows per chunk)...")
+        scan = preprocessor.preprocess_to_snapshot(data_path, path, key, chunksize)
+        print(f"Preprocessing complete! {scan['rows']} destinations")
+
+
+def load_and_preprocess_data(data_path: str = '../data/raw/dest.csv',
+                             compatibility_config: Optional[Union[str, Dict]] = None,
+                             snapshot_dir: Optional[str] = None,
+                             chunksize: Optional[int] = None,
+                             fuzzy_geocoding: Optional[bool] = None) -> Tuple[pd.DataFrame, TripXPreprocessor]:
+    """
+    Read and preprocess the catalog at data_path.
+    
+    With snapshot_dir, the processed catalog is also written there as a binary snapshot
+    keyed by the CSV contents and preprocessor settings; later calls memory-map it
+    instead of preprocessing again, and rebuild it once the key no longer matches.
+    Adding chunksize builds the snapshot with ingest_catalog, streaming the CSV in
+    chunks of that many rows. The loaded catalog itself is still held in memory (text
+    columns in full), so for ingestion alone call ingest_catalog. fuzzy_geocoding=False
+    (default: TRIPX_GEO_FUZZY) skips fuzzy matching of destination names; see Gazetteer.resolve.
+    """
+    if chunksize is not None and snapshot_dir is None:
+        raise ValueError("chunksize requires snapshot_dir: chunked ingestion streams into the snapshot")
+    
+    preprocessor = TripXPreprocessor(compatibility_config, fuzzy_geocoding)
+    
+    if snapshot_dir is not None:
+        path = snapshot_path(snapshot_dir, data_path)
+        key = snapshot_key(data_path, preprocessor.config_state())
+        if chunksize is not None:
+            _ingest_if_stale(preprocessor, data_path, path, key, chunksize)
+        
+        processed_df = load_catalog_snapshot(path, key)
+        
+        if processed_df is not None:
+            preprocessor.norm_stats = preprocessor.compute_norm_stats(processed_df)
+            preprocessor.get_destination_store(processed_df)
+            print(f"Loaded preprocessed catalog snapshot from {path}")
+            print(f"Engineered features: {processed_df.shape[1]}")
+            return processed_df, preprocessor
+    
     df = pd.read_csv(data_path)
-    preprocessor = TripXPreprocessor()
     processed_df = preprocessor.preprocess_destinations(df)
     
     print(f"Preprocessing complete!")
@@ -137,6 +669,12 @@ def load_and_preprocess_data(data_path: str = '../data/raw/dest.csv') -> Tuple[p
     print(f"Engineered features: {processed_df.shape[1]}")
     print(f"New features added: {processed_df.shape[1] - df.shape[1]}")
     
+    if snapshot_dir is not None:
+        try:
+            write_catalog_snapshot(processed_df, path, key, df.shape[1])
+        except OSError as e:
+            print(f"Could not write catalog snapshot to {path}: {e}")
+    
     return processed_df, preprocessor
 
 
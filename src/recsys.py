@@ -1,15 +1,28 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
-from prep import TripXPreprocessor
+import copy
+import threading
+from typing import Dict, List, Tuple, Optional, Union
+from prep import TripXPreprocessor, DestinationStore
+from cache import TTLCache
 
 
 class TripXRecommendationEngine:
     
-    def __init__(self, processed_df: pd.DataFrame, preprocessor: TripXPreprocessor):
-        self.df = processed_df
+    # Identifies a destination for upsert_destinations / delete_destinations
+    key_columns = DestinationStore.key_columns
+    
+    def __init__(self, processed_df: pd.DataFrame, preprocessor: TripXPreprocessor,
+                 cache_size: int = 4096, cache_ttl: Optional[float] = 3600):
         self.preprocessor = preprocessor
         
+        # Results keyed on the normalized user profile; cleared whenever scoring inputs change
+        self.result_cache = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self._result_cache_state = None
+        
+        self._update_lock = threading.Lock()
+        self.df = processed_df
+        
         # Scoring weights for different factors
         self.scoring_weights = {
             'budget_fit': 0.3,
@@ -18,6 +31,184 @@ class TripXRecommendationEngine:
             'season_match': 0.15,
             'quality_bonus': 0.1
         }
+        
+        # Profiles scored together per block in get_recommendations_batch
+        self.batch_chunk_size = 16
+    
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._df
+    
+    @df.setter
+    def df(self, processed_df: pd.DataFrame):
+        # Scoring reads only from the columnar store, so keep it in step with the frame.
+        # The store is built before either is replaced; readers take self.store once per call.
+        store = self.preprocessor.get_destination_store(processed_df)
+        self._df = processed_df
+        self.store = store
+        self.result_cache.clear()
+    
+    def upsert_destinations(self, destinations: Union[pd.DataFrame, List[Dict]]) -> Dict:
+        """
+        Insert new destinations and update existing ones, matched on key_columns.
+        
+        Updates only need the key plus the columns that changed (missing values are left
+        as they were); inserts need every source column. Only the affected rows are preprocessed, and a *_norm column is
+        recomputed for the whole catalog only if its feature's min or max moved.
+        
+        Rows are found through the store's key map. When nothing is inserted, only the
+        columns whose values changed are copied, and the new store reuses every other
+        column and index part of the current one.
+        """
+        updates = destinations if isinstance(destinations, pd.DataFrame) else pd.DataFrame(destinations)
+        
+        with self._update_lock:
+            current = self.df
+            source_columns = self._source_columns(current)
+            
+            unknown = [c for c in updates.columns if c not in source_columns]
+            missing_keys = [c for c in self.key_columns if c not in updates.columns]
+            if unknown or missing_keys:
+                raise ValueError(f"Unknown columns {unknown} or missing key columns {missing_keys}")
+            
+            updates = updates.drop_duplicates(subset=self.key_columns, keep='last').reset_index(drop=True)
+            positions = self._positions_of(self.store, updates)
+            existing = positions >= 0
+            
+            inserts = updates[~existing]
+            missing = [c for c in source_columns if c not in inserts.columns]
+            if len(inserts) and missing:
+                raise ValueError(f"New destinations are missing columns: {missing}")
+            
+            # Shares every column with current; changed columns are replaced, never written in place
+            updated_df = current.copy(deep=False)
+            changed_columns = set()
+            updated_count = int(existing.sum())
+            
+            if updated_count:
+                # Full source rows for the updated destinations: current values overlaid with the
+                # changes; a missing value means the column was not part of that row's update
+                changed = current.iloc[positions[existing]][source_columns].reset_index(drop=True)
+                for column in updates.columns:
+                    values = updates.loc[existing, column].reset_index(drop=True)
+                    given = values.notna()
+                    if given.all():
+                        changed[column] = values.to_numpy()
+                    elif given.any():
+                        changed.loc[given, column] = values[given].to_numpy()
+                changed = self._restore_dtypes(changed, current)
+                changed_columns.update(self._assign_rows(updated_df, positions[existing],
+                                                         self.preprocessor.engineer_features(changed)))
+            
+            if len(inserts):
+                inserted = self._restore_dtypes(inserts[source_columns].reset_index(drop=True), current)
+                inserted = self.preprocessor.engineer_features(inserted)
+                updated_df = pd.concat([updated_df, inserted], ignore_index=True)
+                changed_columns = None
+            
+            touched = np.concatenate([positions[existing], np.arange(len(current), len(updated_df))])
+            renormalized = self._apply_catalog_change(updated_df, touched, changed_columns)
+        
+        return {'updated': updated_count, 'inserted': len(inserts), 'renormalized': renormalized}
+    
+    def delete_destinations(self, keys: List[Tuple[str, str]]) -> Dict:
+        """Remove destinations by (destination, country); unknown keys are ignored."""
+        with self._update_lock:
+            current = self.df
+            positions = self._positions_of(self.store, pd.DataFrame(list(keys), columns=self.key_columns))
+            positions = np.unique(positions[positions >= 0])
+            
+            keep = np.ones(len(current), dtype=bool)
+            keep[positions] = False
+            updated_df = current[keep].reset_index(drop=True)
+            
+            renormalized = self._apply_catalog_change(updated_df, np.empty(0, dtype=np.intp))
+        
+        return {'deleted': len(positions), 'renormalized': renormalized}
+    
+    def _apply_catalog_change(self, updated_df: pd.DataFrame, touched: np.ndarray,
+                              changed_columns: Optional[set] = None) -> List[str]:
+        """
+        Refresh *_norm columns of updated_df, then swap it in as the live catalog.
+        
+        changed_columns names the columns replaced in an updated_df that otherwise has the
+        live catalog's rows in the same order; None means the rows themselves changed.
+        """
+        preprocessor = self.preprocessor
+        norm_stats = preprocessor.compute_norm_stats(updated_df)
+        renormalized = []
+        
+        for feature, bounds in norm_stats.items():
+            column = f'{feature}_norm'
+            if bounds != preprocessor.norm_stats.get(feature):
+                updated_df[column] = preprocessor.normalize_feature(updated_df[feature], bounds)
+                renormalized.append(feature)
+                if changed_columns is not None:
+                    changed_columns.add(column)
+            elif len(touched):
+                values = preprocessor.normalize_feature(updated_df[feature].iloc[touched], bounds)
+                if self._assign_rows(updated_df, touched, values.to_frame(column)) and changed_columns is not None:
+                    changed_columns.add(column)
+        
+        # Built against the live store so unchanged columns carry over; the df setter then finds it cached
+        preprocessor.get_destination_store(
+            updated_df, self.store, sorted(changed_columns) if changed_columns is not None else None
+        )
+        self.df = updated_df
+        preprocessor.norm_stats = norm_stats
+        return renormalized
+    
+    def _assign_rows(self, processed_df: pd.DataFrame, positions: np.ndarray, rows: pd.DataFrame) -> List[str]:
+        """
+        Write rows into processed_df at positions and return the columns that changed.
+        
+        A changed column is replaced by an updated copy rather than written in place, since
+        processed_df may share its arrays with the live catalog. Columns whose values at
+        positions are already equal are left alone.
+        """
+        changed_columns = []
+        
+        for column in rows.columns:
+            values = rows[column].reset_index(drop=True)
+            current = processed_df[column]
+            if current.iloc[positions].reset_index(drop=True).equals(values):
+                continue
+            
+            dtype = current.dtype
+            # Widen a numeric column (e.g. int to float) rather than truncating the new values
+            if dtype.kind in 'biuf' and values.dtype.kind in 'biuf' and np.result_type(dtype, values.dtype) != dtype:
+                updated = current.astype(np.result_type(dtype, values.dtype))
+            else:
+                updated = current.copy()
+            updated.iloc[positions] = values.to_numpy()
+            
+            processed_df[column] = updated
+            changed_columns.append(column)
+        
+        return changed_columns
+    
+    def _restore_dtypes(self, rows: pd.DataFrame, processed_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Cast float columns back to the catalog's integer dtype where every value is whole.
+        
+        Rows given as dicts with different keys come out of pd.DataFrame with NaN in the
+        gaps, which turns integer columns into floats even once the gaps are filled in.
+        """
+        rows = rows.copy()
+        for column in rows.columns:
+            dtype = processed_df[column].dtype
+            values = rows[column]
+            if dtype.kind in 'iu' and values.dtype.kind == 'f' and values.notna().all() and (values % 1 == 0).all():
+                rows[column] = values.astype(dtype)
+        return rows
+    
+    def _source_columns(self, processed_df: pd.DataFrame) -> List[str]:
+        derived = set(self.preprocessor.derived_columns())
+        return [c for c in processed_df.columns if c not in derived]
+    
+    def _positions_of(self, store: DestinationStore, keys: pd.DataFrame) -> np.ndarray:
+        """Row position of each key in store's catalog, -1 where it is absent."""
+        return store.positions_of(zip(*(keys[column] for column in self.key_columns)))
     
     def calculate_budget_fit_score(self, user_budget: float, dest_cost: float) -> float:
         # Perfect fit if destination is within budget
@@ -33,27 +224,24 @@ class TripXRecommendationEngine:
         else:
             return 0.1
     
+    def calculate_budget_fit_score_vectorized(self, user_budget: float, dest_costs: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            budget_ratio = dest_costs / user_budget
+        return np.select(
+            [user_budget >= dest_costs, budget_ratio <= 1.2, budget_ratio <= 1.5],
+            [1.0, 0.8, 0.5],
+            default=0.1
+        )
+    
     def calculate_trip_type_score(self, user_profile: Dict, destination_row: pd.Series) -> float:
-        user_trip_type = user_profile['preferred_trip_type']
-        dest_trip_type = destination_row['trip_type']
-        
-        # Exact match gets full score
-        if user_trip_type == dest_trip_type:
-            return 1.0
-        
-        # Compatible types get partial score
-        type_compatibility = {
-            'culture': ['urban', 'nature'],
-            'beach': ['nature', 'luxury'],
-            'urban': ['culture', 'luxury'],
-            'luxury': ['beach', 'urban'],
-            'nature': ['beach', 'culture']
-        }
-        
-        if dest_trip_type in type_compatibility.get(user_trip_type, []):
-            return 0.6
-        
-        return 0.2
+        return self.preprocessor.compatibility_score(
+            'trip_type', user_profile['preferred_trip_type'], destination_row['trip_type']
+        )
+    
+    def calculate_trip_type_score_vectorized(self, user_profile: Dict, trip_type_codes: np.ndarray,
+                                             trip_type_vocab: List[str]) -> np.ndarray:
+        row = self.preprocessor.compatibility_row('trip_type', user_profile['preferred_trip_type'], trip_type_vocab)
+        return row[trip_type_codes]
     
     def calculate_overall_score(self, user_profile: Dict, destination_row: pd.Series) -> Tuple[float, Dict]:
         budget_score = self.calculate_budget_fit_score(
@@ -91,25 +279,113 @@ class TripXRecommendationEngine:
         
         return total_score, score_breakdown
     
-    def filter_destinations(self, user_profile: Dict) -> pd.DataFrame:
-        filtered_df = self.df.copy()
+    def calculate_overall_scores_vectorized(self, user_profile: Dict, store: DestinationStore,
+                                            positions: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Score the store rows at positions (all rows by default); element-wise identical to calculate_overall_score."""
+        if positions is None:
+            positions = slice(None)
+        
+        budget_scores = self.calculate_budget_fit_score_vectorized(
+            user_profile['budget'], store['avg_cost_per_day'][positions]
+        )
+        
+        duration_scores = self.preprocessor.calculate_duration_compatibility_vectorized(
+            user_profile['duration'], store['min_days'][positions], store['max_days'][positions]
+        )
         
+        trip_type_scores = self.calculate_trip_type_score_vectorized(
+            user_profile, store['trip_type_code'][positions], store.vocabularies['trip_type']
+        )
+        
+        season_scores = self.preprocessor.calculate_season_match_vectorized(
+            user_profile['preferred_season'], store['season_best_code'][positions], store.vocabularies['season_best']
+        )
+        
+        quality_scores = store['quality_score_norm'][positions]
+        
+        return self._combine_scores(budget_scores, duration_scores, trip_type_scores, season_scores, quality_scores)
+    
+    def calculate_profile_block_scores(self, user_profiles: List[Dict],
+                                       store: DestinationStore) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Score several profiles against every store row at once; returns (profiles x destinations) arrays."""
+        budgets = np.array([[profile['budget']] for profile in user_profiles])
+        durations = np.array([[profile['duration']] for profile in user_profiles])
+        
+        budget_scores = self.calculate_budget_fit_score_vectorized(budgets, store['avg_cost_per_day'])
+        
+        duration_scores = self.preprocessor.calculate_duration_compatibility_vectorized(
+            durations, store['min_days'], store['max_days']
+        )
+        
+        trip_type_vocab = store.vocabularies['trip_type']
+        trip_type_rows = np.stack([
+            self.preprocessor.compatibility_row('trip_type', profile['preferred_trip_type'], trip_type_vocab)
+            for profile in user_profiles
+        ])
+        trip_type_scores = trip_type_rows[:, store['trip_type_code']]
+        
+        season_vocab = store.vocabularies['season_best']
+        season_rows = np.stack([
+            self.preprocessor.compatibility_row('season_best', profile['preferred_season'], season_vocab)
+            for profile in user_profiles
+        ])
+        season_scores = season_rows[:, store['season_best_code']]
+        
+        quality_scores = np.broadcast_to(store['quality_score_norm'], budget_scores.shape)
+        
+        return self._combine_scores(budget_scores, duration_scores, trip_type_scores, season_scores, quality_scores)
+    
+    def _combine_scores(self, budget_scores: np.ndarray, duration_scores: np.ndarray, trip_type_scores: np.ndarray,
+                        season_scores: np.ndarray, quality_scores: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        # Same summation order as calculate_overall_score so totals match bit for bit
+        total_scores = (
+            self.scoring_weights['budget_fit'] * budget_scores +
+            self.scoring_weights['duration_fit'] * duration_scores +
+            self.scoring_weights['trip_type_match'] * trip_type_scores +
+            self.scoring_weights['season_match'] * season_scores +
+            self.scoring_weights['quality_bonus'] * quality_scores
+        )
+        
+        score_breakdowns = {
+            'budget_fit': budget_scores,
+            'duration_fit': duration_scores,
+            'trip_type_match': trip_type_scores,
+            'season_match': season_scores,
+            'quality_bonus': quality_scores,
+            'total_score': total_scores
+        }
+        
+        return total_scores, score_breakdowns
+    
+    def _filter_mask(self, user_budget, user_duration, store: DestinationStore) -> np.ndarray:
         # Filter by budget (allow some flexibility)
-        max_budget = user_profile['budget'] * 1.3
-        filtered_df = filtered_df[filtered_df['avg_cost_per_day'] <= max_budget]
+        max_budget = user_budget * 1.3
+        keep = store['avg_cost_per_day'] <= max_budget
         
         # Filter by duration compatibility
-        user_duration = user_profile['duration']
-        duration_compatible = filtered_df.apply(
-            lambda row: self.preprocessor.calculate_duration_compatibility(
-                user_duration, row['min_days'], row['max_days']
-            ) >= 0.2, axis=1
+        duration_scores = self.preprocessor.calculate_duration_compatibility_vectorized(
+            user_duration, store['min_days'], store['max_days']
         )
-        filtered_df = filtered_df[duration_compatible]
+        return keep & (duration_scores >= 0.2)
+    
+    def _filter_positions(self, user_profile: Dict, store: DestinationStore) -> np.ndarray:
+        """Same rows as _filter_mask, found through the store index in ascending position order."""
+        index = store.index
         
-        return filtered_df
+        # Filter by budget (allow some flexibility)
+        positions = index.within_budget(user_profile['budget'] * 1.3)
+        
+        # Filter by duration compatibility
+        max_distance = self.preprocessor.max_duration_distance(0.2)
+        if max_distance is not None:
+            positions = np.intersect1d(positions, index.duration_matches(user_profile['duration'], max_distance))
+        
+        return np.sort(positions)
     
-    def generate_explanation(self, destination_row: pd.Series, score_breakdown: Dict, 
+    def filter_destinations(self, user_profile: Dict) -> pd.DataFrame:
+        return self.df.iloc[self._filter_positions(user_profile, self.store)]
+    
+    def generate_explanation(self, destination_row, score_breakdown: Dict, 
                            user_profile: Dict) -> str:
         dest_name = destination_row['destination']
         cost = destination_row['avg_cost_per_day']
@@ -148,7 +424,126 @@ class TripXRecommendationEngine:
         return " • ".join(explanations)
     
     def get_recommendations(self, user_profile: Dict, top_n: int = 5) -> List[Dict]:
-        filtered_destinations = self.filter_destinations(user_profile)
+        store = self.store
+        self._sync_result_cache()
+        cache_key = (self._profile_key(user_profile), top_n)
+        
+        recommendations = self.result_cache.get(cache_key)
+        if recommendations is None:
+            recommendations = self._compute_recommendations(user_profile, top_n, store)
+            # Results computed against a catalog that was swapped out meanwhile are not cached
+            if self.store is store:
+                self.result_cache.set(cache_key, recommendations)
+        
+        # Callers get their own copy so the cached entry can't be mutated
+        return copy.deepcopy(recommendations)
+    
+    def _profile_key(self, user_profile: Dict) -> Tuple:
+        # 100 and 100.0 hash alike but explain differently ("$100" vs "$100.0"), so the type is part of the key
+        return tuple((name, type(value), value) for name, value in sorted(user_profile.items()))
+    
+    def _sync_result_cache(self):
+        state = (id(self.store), tuple(sorted(self.scoring_weights.items())), self.preprocessor.config_version)
+        if state != self._result_cache_state:
+            self.result_cache.clear()
+            self._result_cache_state = state
+    
+    def _compute_recommendations(self, user_profile: Dict, top_n: int,
+                                 store: Optional[DestinationStore] = None) -> List[Dict]:
+        store = store if store is not None else self.store
+        positions = self._filter_positions(user_profile, store)
+        
+        if len(positions) == 0:
+            return []
+        
+        total_scores, score_arrays = self.calculate_overall_scores_vectorized(user_profile, store, positions)
+        
+        return self._materialize_top_k(user_profile, store, positions, total_scores, score_arrays, top_n)
+    
+    def get_recommendations_batch(self, user_profiles: List[Dict], top_n: int = 5,
+                                  chunk_size: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Recommendations for many profiles, scored as a profiles x destinations matrix.
+        
+        Profiles are processed chunk_size at a time (default batch_chunk_size) so peak memory
+        stays around chunk_size * len(catalog) scores. Each result list is identical to what
+        get_recommendations returns for that profile.
+        """
+        chunk_size = chunk_size or self.batch_chunk_size
+        store = self.store
+        results = []
+        
+        for start in range(0, len(user_profiles), chunk_size):
+            chunk = user_profiles[start:start + chunk_size]
+            
+            budgets = np.array([[profile['budget']] for profile in chunk])
+            durations = np.array([[profile['duration']] for profile in chunk])
+            keep = self._filter_mask(budgets, durations, store)
+            
+            total_scores, score_arrays = self.calculate_profile_block_scores(chunk, store)
+            
+            for row, user_profile in enumerate(chunk):
+                positions = np.flatnonzero(keep[row])
+                
+                if len(positions) == 0:
+                    results.append([])
+                    continue
+                
+                profile_scores = {name: values[row, positions] for name, values in score_arrays.items()}
+                results.append(self._materialize_top_k(
+                    user_profile, store, positions, total_scores[row, positions], profile_scores, top_n
+                ))
+        
+        return results
+    
+    def _materialize_top_k(self, user_profile: Dict, store: DestinationStore, positions: np.ndarray,
+                           total_scores: np.ndarray, score_arrays: Dict[str, np.ndarray], top_n: int) -> List[Dict]:
+        # Only the winners are turned into result dicts and explained
+        recommendations = []
+        
+        for i in self._select_top_k(total_scores, top_n):
+            row = store.row(positions[i])
+            score_breakdown = {name: values[i].item() for name, values in score_arrays.items()}
+            
+            explanation = self.generate_explanation(row, score_breakdown, user_profile)
+            
+            recommendations.append(self._build_recommendation(row, score_breakdown['total_score'],
+                                                              score_breakdown, explanation))
+        
+        return recommendations
+    
+    def _select_top_k(self, total_scores: np.ndarray, top_n: int) -> np.ndarray:
+        """
+        Indices of the top_n scores, ordered like a stable descending sort on round(score, 3).
+        
+        Partial selection runs on np.round values; since np.round can land one unit away from
+        Python's round, the cut is widened slightly and the few candidates are ranked exactly.
+        """
+        count = len(total_scores)
+        if top_n <= 0 or count == 0:
+            return np.empty(0, dtype=np.intp)
+        
+        if top_n < count:
+            approx_scores = np.round(total_scores, 3)
+            kth_score = np.partition(approx_scores, count - top_n)[count - top_n]
+            candidates = np.flatnonzero(approx_scores >= kth_score - 0.0025)
+        else:
+            candidates = np.arange(count)
+        
+        rounded = [round(score, 3) for score in total_scores[candidates].tolist()]
+        order = sorted(range(len(candidates)), key=lambda i: rounded[i], reverse=True)
+        
+        return candidates[order[:top_n]]
+    
+    def get_recommendations_reference(self, user_profile: Dict, top_n: int = 5) -> List[Dict]:
+        """Original row-by-row implementation, kept as the reference for equivalence tests."""
+        filtered_destinations = self.df[self.df['avg_cost_per_day'] <= user_profile['budget'] * 1.3]
+        duration_compatible = filtered_destinations.apply(
+            lambda row: self.preprocessor.calculate_duration_compatibility(
+                user_profile['duration'], row['min_days'], row['max_days']
+            ) >= 0.2, axis=1
+        )
+        filtered_destinations = filtered_destinations[duration_compatible]
         
         if filtered_destinations.empty:
             return []
@@ -160,43 +555,41 @@ class TripXRecommendationEngine:
             
             explanation = self.generate_explanation(row, score_breakdown, user_profile)
             
-            recommendation = {
-                'destination': row['destination'],
-                'country': row['country'],
-                'region': row['region'],
-                'cost_per_day': row['avg_cost_per_day'],
-                'trip_type': row['trip_type'],
-                'duration_range': f"{row['min_days']}-{row['max_days']} days",
-                'best_season': row['season_best'],
-                'popularity_score': row['popularity_score'],
-                'safety_score': row['safety_score'],
-                'overall_score': round(total_score, 3),
-                'explanation': explanation,
-                'score_breakdown': score_breakdown
-            }
-            
-            recommendations.append(recommendation)
+            recommendations.append(self._build_recommendation(row, total_score, score_breakdown, explanation))
         
         recommendations.sort(key=lambda x: x['overall_score'], reverse=True)
         
         return recommendations[:top_n]
     
+    def _build_recommendation(self, row, total_score: float, score_breakdown: Dict, explanation: str) -> Dict:
+        return {
+            'destination': row['destination'],
+            'country': row['country'],
+            'region': row['region'],
+            'cost_per_day': row['avg_cost_per_day'],
+            'trip_type': row['trip_type'],
+            'duration_range': f"{row['min_days']}-{row['max_days']} days",
+            'best_season': row['season_best'],
+            'popularity_score': row['popularity_score'],
+            'safety_score': row['safety_score'],
+            'latitude': None if pd.isna(row['latitude']) else row['latitude'],
+            'longitude': None if pd.isna(row['longitude']) else row['longitude'],
+            'overall_score': round(total_score, 3),
+            'explanation': explanation,
+            'score_breakdown': score_breakdown
+        }
+    
     def explain_no_results(self, user_profile: Dict) -> str:
+        store = self.store
         explanations = []
         
-        budget_destinations = self.df[self.df['avg_cost_per_day'] <= user_profile['budget'] * 1.3]
-        if budget_destinations.empty:
-            min_cost = self.df['avg_cost_per_day'].min()
+        if len(store.index.within_budget(user_profile['budget'] * 1.3)) == 0:
+            min_cost = store['avg_cost_per_day'].min()
             explanations.append(f"Budget too low - minimum destination cost is ${min_cost}/day")
         
         user_duration = user_profile['duration']
-        duration_compatible = self.df.apply(
-            lambda row: self.preprocessor.calculate_duration_compatibility(
-                user_duration, row['min_days'], row['max_days']
-            ) >= 0.2, axis=1
-        )
-        
-        if not duration_compatible.any():
+        max_distance = self.preprocessor.max_duration_distance(0.2)
+        if len(store.index.duration_matches(user_duration, max_distance)) == 0:
             explanations.append(f"No destinations suitable for {user_duration}-day trips")
         
         if not explanations:
@@ -205,10 +598,11 @@ class TripXRecommendationEngine:
         return " • ".join(explanations)
 
 
-def create_recommendation_engine(data_path: str = '../data/raw/dest.csv'):
+def create_recommendation_engine(data_path: str = '../data/raw/dest.csv', compatibility_config=None,
+                                 snapshot_dir: Optional[str] = None):
     from prep import load_and_preprocess_data
     
-    processed_df, preprocessor = load_and_preprocess_data(data_path)
+    processed_df, preprocessor = load_and_preprocess_data(data_path, compatibility_config, snapshot_dir)
     engine = TripXRecommendationEngine(processed_df, preprocessor)
     
     return engine, processed_df
@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies with percentile lookups."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+
+        if not samples:
+            return None
+
+        # Nearest-rank percentile
+        rank = max(0, min(len(samples) - 1, int(round(p / 100 * len(samples))) - 1))
+        return samples[rank]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures; open -> half-open after
+    recovery_time seconds, when a single probe call is let through. The probe closes the
+    circuit if it succeeds and reopens it if it fails.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.recovery_time:
+                self.state = 'half_open'
+
+            if self.state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def record_abandoned(self):
+        """A call that was let through ended without an outcome (e.g. cancelled by a hedge)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class ProviderHealth:
+    """
+    Latency and failure tracking for one LLM provider.
+
+    timeout() derives the per-call deadline from recent latency: timeout_multiplier times
+    the p95, kept between min_timeout and max_timeout. Until min_samples calls have been
+    seen, max_timeout is used as-is. Streams also get first_chunk_timeout(), derived the
+    same way from how long their first chunk took.
+
+    Only successful calls are latency samples. A timed-out call would record the deadline
+    itself, pulling the p95, and so the next deadline, up towards max_timeout.
+    """
+
+    def __init__(self, max_timeout: float = 30.0, min_timeout: float = 2.0, timeout_multiplier: float = 3.0,
+                 min_samples: int = 20, failure_threshold: int = 5, recovery_time: float = 30.0):
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+
+        self.latency = LatencyTracker()
+        self.first_chunk_latency = LatencyTracker()
+        self.breaker = CircuitBreaker(failure_threshold, recovery_time)
+
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def timeout(self) -> float:
+        return self._deadline(self.latency)
+
+    def first_chunk_timeout(self) -> float:
+        """Deadline for the first chunk of a stream; the whole stream still gets timeout()."""
+        return self._deadline(self.first_chunk_latency)
+
+    def hedge_delay(self, default: float) -> float:
+        """How long to wait on this provider before hedging: its p95 once known, else default."""
+        return self._p95(self.latency, default)
+
+    def stream_hedge_delay(self, default: float) -> float:
+        """How long to wait for a stream's first chunk before hedging: its p95 once known, else default."""
+        return self._p95(self.first_chunk_latency, default)
+
+    def _deadline(self, latency: LatencyTracker) -> float:
+        p95 = self._p95(latency, None)
+        if p95 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_multiplier))
+
+    def _p95(self, latency: LatencyTracker, default: Optional[float]) -> Optional[float]:
+        p95 = latency.percentile(95)
+        if p95 is None or len(latency) < self.min_samples:
+            return default
+        return p95
+
+    def allow(self) -> bool:
+        allowed = self.breaker.allow()
+        if not allowed:
+            self.rejected += 1
+        return allowed
+
+    def record_success(self, seconds: Optional[float] = None):
+        self.successes += 1
+        if seconds is not None:
+            self.latency.record(seconds)
+        self.breaker.record_success()
+
+    def record_first_chunk(self, seconds: float):
+        self.first_chunk_latency.record(seconds)
+
+    def record_failure(self):
+        self.failures += 1
+        self.breaker.record_failure()
+
+    def stats(self) -> Dict:
+        return {
+            'state': self.breaker.state,
+            'successes': self.successes,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'times_opened': self.breaker.times_opened,
+            'p50': self.latency.percentile(50),
+            'p95': self.latency.percentile(95),
+            'timeout': self.timeout(),
+            'first_chunk_p95': self.first_chunk_latency.percentile(95),
+            'first_chunk_timeout': self.first_chunk_timeout()
+        }
+
+
+_provider_health = {}
+_provider_health_lock = threading.Lock()
+
+
+def get_provider_health(provider: str, max_timeout: float = 30.0) -> ProviderHealth:
+    """Process-wide health record for provider, shared by every engine that calls it."""
+    with _provider_health_lock:
+        if provider not in _provider_health:
+            _provider_health[provider] = ProviderHealth(max_timeout=max_timeout)
+        return _provider_health[provider]
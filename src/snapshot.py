@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import dtype_to_descr, write_array_header_1_0
+
+
+SNAPSHOT_FORMAT_VERSION = 2
+MANIFEST_NAME = 'manifest.json'
+CURRENT_NAME = 'CURRENT'
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_key(data_path: str, preprocessor_config: Dict) -> str:
+    """Key of a processed catalog: the source file contents plus everything that shapes preprocessing."""
+    config = json.dumps(preprocessor_config, sort_keys=True, default=str)
+    payload = f"{SNAPSHOT_FORMAT_VERSION}\n{file_digest(data_path)}\n{config}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def snapshot_path(snapshot_dir: str, data_path: str) -> str:
+    return os.path.join(snapshot_dir, os.path.splitext(os.path.basename(data_path))[0])
+
+
+def column_spec(name: str, values: pd.Series) -> Dict:
+    """How a column is stored: numeric columns as they are, text as fixed-width unicode."""
+    if values.dtype.kind in 'biuf':
+        return {'name': name, 'kind': 'numeric', 'dtype': values.dtype.str, 'pandas_dtype': str(values.dtype)}
+
+    lengths = values.str.len()
+    width = int(lengths.max()) if lengths.notna().any() else 0
+    return {'name': name, 'kind': 'text', 'dtype': f'<U{max(width, 1)}', 'pandas_dtype': str(values.dtype),
+            'nullable': bool(values.isna().any())}
+
+
+def merge_column_specs(spec: Dict, other: Dict) -> Dict:
+    """Spec that can hold the values of both, for a column seen in several chunks."""
+    if spec['kind'] == 'numeric' and other['kind'] == 'numeric':
+        dtype = np.result_type(np.dtype(spec['dtype']), np.dtype(other['dtype']))
+        return dict(spec, dtype=dtype.str, pandas_dtype=str(dtype))
+
+    if spec['kind'] == 'text' and other['kind'] == 'text':
+        width = max(np.dtype(spec['dtype']).itemsize, np.dtype(other['dtype']).itemsize) // 4
+        return dict(spec, dtype=f'<U{width}', nullable=spec['nullable'] or other['nullable'])
+
+    # Text in one chunk, numeric (usually all missing) in another: keep it as text
+    text = spec if spec['kind'] == 'text' else other
+    return dict(text, nullable=True)
+
+
+def encode_column(spec: Dict, values: pd.Series):
+    """Array to write for a column, plus a null mask for text columns that can hold missing values."""
+    if spec['kind'] == 'numeric':
+        return values.to_numpy(dtype=spec['dtype']), None
+
+    nulls = values.isna().to_numpy()
+    text = values.to_numpy(dtype=object)
+    if nulls.any():
+        text = np.where(nulls, '', text)
+    return text.astype(spec['dtype']), (nulls if spec.get('nullable') else None)
+
+
+def decode_column(spec: Dict, array: np.ndarray, nulls: Optional[np.ndarray]) -> pd.Series:
+    if spec['kind'] == 'numeric':
+        # A plain ndarray view keeps the mapping without memmap leaking into derived arrays
+        return pd.Series(array.view(np.ndarray), name=spec['name'], copy=False)
+
+    values = array.astype(object)
+    if nulls is not None:
+        values[nulls] = None
+    return pd.Series(values, name=spec['name']).astype(spec['pandas_dtype'])
+
+
+class SnapshotWriter:
+    """
+    Fills a snapshot bundle block by block, appending each column to its .npy file.
+
+    The column specs and row count go into the .npy headers up front and blocks must
+    arrive in row order. Writes go straight to the files rather than through memory
+    maps, so only the current block is held in memory. close() writes the manifest
+    and publishes the bundle as the new version of the snapshot (see publish_snapshot).
+    """
+
+    def __init__(self, path: str, key: str, rows: int, specs: List[Dict], source_columns: int):
+        self.path = path
+        self.key = key
+        self.rows = rows
+        self.source_columns = source_columns
+        self.specs = [dict(spec) for spec in specs]
+        self.rows_written = 0
+
+        self.staging = staging_dir(path)
+
+        self._files = {}
+        for position, spec in enumerate(self.specs):
+            spec['file'] = f"{position}.npy"
+            self._files[spec['file']] = self._open_array(spec['file'], np.dtype(spec['dtype']))
+            if spec.get('nullable'):
+                spec['null_file'] = f"{position}.null.npy"
+                self._files[spec['null_file']] = self._open_array(spec['null_file'], np.dtype(np.bool_))
+
+    def write(self, frame: pd.DataFrame):
+        """Append frame's rows after those already written."""
+        for spec in self.specs:
+            array, nulls = encode_column(spec, frame[spec['name']])
+            self._files[spec['file']].write(np.ascontiguousarray(array).tobytes())
+            if 'null_file' in spec:
+                self._files[spec['null_file']].write(np.ascontiguousarray(nulls).tobytes())
+        self.rows_written += len(frame)
+
+    def close(self):
+        self._close_files()
+
+        if self.rows_written != self.rows:
+            self.abort()
+            raise ValueError(f"Snapshot expected {self.rows} rows but {self.rows_written} were written")
+
+        write_manifest(self.staging, self.key, self.rows, self.source_columns, self.specs)
+        publish_snapshot(self.staging, self.path)
+
+    def abort(self):
+        self._close_files()
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+    def _open_array(self, name: str, dtype: np.dtype):
+        f = open(os.path.join(self.staging, name), 'wb')
+        write_array_header_1_0(f, {'descr': dtype_to_descr(dtype), 'fortran_order': False, 'shape': (self.rows,)})
+        return f
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+def write_catalog_snapshot(processed_df: pd.DataFrame, path: str, key: str, source_columns: int):
+    """Write processed_df as a directory of one .npy file per column plus a manifest."""
+    specs = [column_spec(name, processed_df[name]) for name in processed_df.columns]
+
+    writer = SnapshotWriter(path, key, len(processed_df), specs, source_columns)
+    try:
+        writer.write(processed_df)
+    except Exception:
+        writer.abort()
+        raise
+    writer.close()
+
+
+def write_manifest(directory: str, key: str, rows: int, source_columns: int, specs):
+    manifest = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'key': key,
+        'rows': rows,
+        'source_columns': source_columns,
+        'columns': specs
+    }
+    with open(os.path.join(directory, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def staging_dir(path: str) -> str:
+    """New empty directory under path to write a snapshot version into before publish_snapshot."""
+    staging = os.path.join(path, f"tmp-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(staging)
+    return staging
+
+
+def publish_snapshot(staging: str, path: str):
+    """
+    Make the version written in staging the one readers of path get.
+
+    Versions sit side by side under path and the CURRENT file names the live one.
+    Swapping CURRENT is a single rename, so a reader of path finds either the previous
+    version or the new one, never no snapshot. The version it replaces is kept for
+    readers that resolved it just before the swap; older ones are removed.
+    """
+    version = f"v-{time.time_ns()}-{os.getpid()}"
+    os.replace(staging, os.path.join(path, version))
+
+    previous = _current_version(path)
+    pointer = os.path.join(path, f"{CURRENT_NAME}.tmp-{os.getpid()}")
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, CURRENT_NAME))
+
+    for name in os.listdir(path):
+        # Staging files of writers still running are theirs to publish or abort
+        if name in (version, previous, CURRENT_NAME) or name.startswith(('tmp-', f'{CURRENT_NAME}.tmp-')):
+            continue
+        entry = os.path.join(path, name)
+        if os.path.isdir(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+
+
+def current_snapshot_dir(path: str) -> Optional[str]:
+    """Directory of the live version of the snapshot at path, or None if none was published."""
+    version = _current_version(path)
+    return os.path.join(path, version) if version is not None else None
+
+
+def _current_version(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, CURRENT_NAME)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def read_manifest(path: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def snapshot_is_current(path: str, key: str) -> bool:
+    """Whether the snapshot at path was written for key, checked from its manifest alone."""
+    return _current_manifest(current_snapshot_dir(path), key) is not None
+
+
+def _current_manifest(directory: Optional[str], key: str) -> Optional[Dict]:
+    manifest = read_manifest(directory) if directory is not None else None
+    if manifest is None or manifest.get('key') != key or manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def load_catalog_snapshot(path: str, key: str) -> Optional[pd.DataFrame]:
+    """
+    Memory-map the snapshot at path if it was written for key, otherwise return None.
+
+    Numeric columns are read straight from the mapped files; text columns are decoded
+    back to the dtype they had when the snapshot was written, so they do take memory.
+    """
+    # Resolved once, so every file comes from the same version even if a new one is published meanwhile
+    directory = current_snapshot_dir(path)
+    manifest = _current_manifest(directory, key)
+    if manifest is None:
+        return None
+
+    try:
+        columns = {}
+        for spec in manifest['columns']:
+            array = np.load(os.path.join(directory, spec['file']), mmap_mode='r', allow_pickle=False)
+            nulls = None
+            if 'null_file' in spec:
+                nulls = np.load(os.path.join(directory, spec['null_file']), allow_pickle=False)
+            columns[spec['name']] = decode_column(spec, array, nulls)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Catalog snapshot at {path} unreadable ({e}); rebuilding")
+        return None
+
+    return pd.DataFrame(columns, copy=False)
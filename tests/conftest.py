@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+# Caches go to a scratch directory, and the mock provider answers instantly
+os.environ.setdefault('TRIPX_CACHE_DIR', tempfile.mkdtemp(prefix='tripx-test-cache-'))
+os.environ.setdefault('TRIPX_MOCK_LATENCY', 'constant')
+os.environ.setdefault('TRIPX_MOCK_LATENCY_MEDIAN', '0')
+os.environ.setdefault('TRIPX_MOCK_LATENCY_P95', '0')
+os.environ.setdefault('TRIPX_MOCK_TOKENS_PER_SECOND', '100000')
+
+from prep import TripXPreprocessor
+from recsys import TripXRecommendationEngine
+
+
+DATA_PATH = os.path.join(ROOT, 'data', 'raw', 'dest.csv')
+
+
+@pytest.fixture
+def raw_catalog() -> pd.DataFrame:
+    return pd.read_csv(DATA_PATH)
+
+
+def build_engine(raw_df: pd.DataFrame) -> TripXRecommendationEngine:
+    preprocessor = TripXPreprocessor()
+    return TripXRecommendationEngine(preprocessor.preprocess_destinations(raw_df), preprocessor)
+
+
+@pytest.fixture
+def engine(raw_catalog) -> TripXRecommendationEngine:
+    return build_engine(raw_catalog)
@@ -0,0 +1,44 @@
+import asyncio
+
+from llm_engine import FreeAPIIntegrator
+from mock_provider import MockProvider
+
+
+def integrator() -> FreeAPIIntegrator:
+    mock = MockProvider(latency='constant', latency_median=0, latency_p95=0, tokens_per_second=100000)
+    return FreeAPIIntegrator(provider='mock', mock_provider=mock)
+
+
+def test_nearby_coordinates_share_a_weather_entry():
+    api = integrator()
+
+    async def main():
+        return await asyncio.gather(api.aget_weather_data(48.8566, 2.3522), api.aget_weather_data(48.8712, 2.3650),
+                                    api.aget_weather_data(48.9, 2.4), api.aget_weather_data(51.5074, -0.1278))
+
+    paris, nearby, again, london = asyncio.run(main())
+
+    assert paris == nearby == again != london
+    assert api.mock_provider.stats()['calls'] == 2
+    assert api.cache_stats()['weather']['fetches'] == 2
+
+
+def test_attractions_are_keyed_by_radius():
+    api = integrator()
+
+    async def main():
+        for radius in (1000, 5000, 1000):
+            await api.aget_attractions(48.8566, 2.3522, radius)
+
+    asyncio.run(main())
+
+    assert api.cache_stats()['attractions']['fetches'] == 2
+    assert api.cache_stats()['attractions']['hits'] == 1
+
+
+def test_callers_get_copies_of_cached_entries():
+    api = integrator()
+    first = asyncio.run(api.aget_weather_data(48.8566, 2.3522))
+    first['current_temp'] = -100
+
+    assert asyncio.run(api.aget_weather_data(48.8566, 2.3522))['current_temp'] != -100
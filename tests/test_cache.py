@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+from cache import PersistentCache, StaleWhileRevalidateCache, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(ttl=0.05)
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_persistent_cache_survives_reopen(tmp_path):
+    path = str(tmp_path / 'responses.sqlite')
+    PersistentCache(path).set('key', 'value')
+
+    reopened = PersistentCache(path)
+    assert reopened.get('key') == 'value'
+    assert reopened.stats()['disk_hits'] == 1
+
+
+def test_disk_tier_expires_entries(tmp_path):
+    path = str(tmp_path / 'responses.sqlite')
+    PersistentCache(path, ttl=0.05).set('key', 'value')
+    time.sleep(0.1)
+
+    reopened = PersistentCache(path, ttl=0.05)
+    assert reopened.get('key') is None
+    assert reopened.stats()['disk_entries'] == 0
+
+
+def test_disk_tier_drops_least_recently_used(tmp_path):
+    path = str(tmp_path / 'responses.sqlite')
+    cache = PersistentCache(path, max_memory_entries=0, max_disk_entries=60)
+
+    for i in range(50):
+        cache.set(f'key{i}', 'value')
+    # Read key0 so it is no longer the least recently used when the 100th write prunes
+    assert cache.get('key0') == 'value'
+    for i in range(50, 100):
+        cache.set(f'key{i}', 'value')
+
+    assert cache.stats()['disk_entries'] == 60
+    assert cache.get('key0') == 'value'
+    assert cache.get('key1') is None
+
+
+def test_async_access_keeps_disk_work_off_the_loop(tmp_path):
+    cache = PersistentCache(str(tmp_path / 'responses.sqlite'), max_memory_entries=0)
+    disk_threads = set()
+    disk_get, disk_set = cache._disk_get, cache._disk_set
+    cache._disk_get = lambda *args: disk_threads.add(threading.current_thread()) or disk_get(*args)
+    cache._disk_set = lambda *args: disk_threads.add(threading.current_thread()) or disk_set(*args)
+
+    async def main():
+        await cache.aset('key', 'value')
+        return await cache.aget('key'), await cache.aget('missing')
+
+    assert asyncio.run(main()) == ('value', None)
+    assert disk_threads and threading.current_thread() not in disk_threads
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = StaleWhileRevalidateCache(ttl=60, stale_ttl=60)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'value'
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_fetch('key', fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ['value'] * 5
+    assert len(calls) == 1
+
+
+def test_fetches_on_different_loops_do_not_share_tasks():
+    cache = StaleWhileRevalidateCache(ttl=60, stale_ttl=60)
+    started = threading.Event()
+
+    async def fetch():
+        started.set()
+        await asyncio.sleep(0.2)
+        return 'value'
+
+    results = {}
+    other_loop = threading.Thread(target=lambda: results.setdefault(
+        'other', asyncio.run(cache.get_or_fetch('key', fetch))
+    ))
+    other_loop.start()
+    started.wait()
+
+    # The same key is in flight on the other thread's loop
+    results['this'] = asyncio.run(cache.get_or_fetch('key', fetch))
+    other_loop.join()
+
+    assert results == {'other': 'value', 'this': 'value'}
+
+
+def test_stale_entry_is_served_while_refreshing():
+    cache = StaleWhileRevalidateCache(ttl=0.05, stale_ttl=60)
+    values = iter(['first', 'second'])
+
+    async def fetch():
+        return next(values)
+
+    async def main():
+        assert await cache.get_or_fetch('key', fetch) == 'first'
+        await asyncio.sleep(0.1)
+        stale = await cache.get_or_fetch('key', fetch)
+        await asyncio.sleep(0)
+        return stale, await cache.get_or_fetch('key', fetch)
+
+    assert asyncio.run(main()) == ('first', 'second')
+    assert cache.stats()['stale_hits'] == 1
+
+
+def test_failed_fetch_keeps_the_cached_value():
+    cache = StaleWhileRevalidateCache(ttl=0, stale_ttl=60)
+    values = iter(['value', None, None])
+
+    async def fetch():
+        return next(values)
+
+    async def main():
+        await cache.get_or_fetch('key', fetch)
+        await cache.get_or_fetch('key', fetch)
+        await asyncio.sleep(0)
+        return await cache.get_or_fetch('key', fetch)
+
+    assert asyncio.run(main()) == 'value'
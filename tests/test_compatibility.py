@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+
+from prep import TripXPreprocessor
+
+
+CONFIG = {
+    'trip_type': {'compatible_score': 0.5, 'overrides': {'culture': {'beach': 0.9}}},
+    'season_best': {'default_score': 0.1}
+}
+
+
+def test_config_from_dict_and_file_agree(tmp_path):
+    path = tmp_path / 'compatibility.json'
+    path.write_text(json.dumps(CONFIG))
+
+    from_dict = TripXPreprocessor(CONFIG)
+    from_file = TripXPreprocessor(str(path))
+
+    assert from_dict.compatibility_tables == from_file.compatibility_tables
+    assert from_dict.compatibility_score('trip_type', 'culture', 'beach') == 0.9
+    assert from_dict.compatibility_score('trip_type', 'culture', 'urban') == 0.5
+    assert from_dict.compatibility_score('season_best', 'spring', 'winter') == 0.1
+
+
+def test_matrices_match_scalar_scores():
+    preprocessor = TripXPreprocessor(CONFIG)
+
+    for column, vocab in (('trip_type', preprocessor.trip_types + ['adventure']),
+                          ('season_best', preprocessor.seasons)):
+        matrix = preprocessor.compatibility_matrix(column, vocab)
+        expected = [[preprocessor.compatibility_score(column, u, d) for d in vocab] for u in vocab]
+        np.testing.assert_array_equal(matrix, expected)
+
+        row = preprocessor.compatibility_row(column, 'monsoon', vocab)
+        np.testing.assert_array_equal(row, [preprocessor.compatibility_score(column, 'monsoon', d) for d in vocab])
+
+
+def test_reload_invalidates_matrices_and_results(engine):
+    profile = engine.preprocessor.create_user_profile_features(100, 7, 'culture', 'spring')
+    before = engine.get_recommendations(profile, 500)
+    version = engine.preprocessor.config_version
+
+    engine.preprocessor.load_compatibility_config(CONFIG)
+
+    assert engine.preprocessor.config_version == version + 1
+    assert engine.get_recommendations(profile, 500) == engine.get_recommendations_reference(profile, 500)
+    assert engine.get_recommendations(profile, 500) != before
+
+
+@pytest.mark.parametrize('config', [{'activity': {}}, {'trip_type': {'bonus_score': 1.0}}])
+def test_unknown_config_is_rejected(config):
+    with pytest.raises(ValueError):
+        TripXPreprocessor(config)
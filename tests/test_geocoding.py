@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from geocoding import get_gazetteer
+from prep import TripXPreprocessor
+
+
+def expected_match(gazetteer, destination, country):
+    match = gazetteer.lookup(destination, country)
+    if match is None:
+        return np.nan, np.nan, 'none'
+    if match.precision == 'country':
+        return np.nan, np.nan, 'country'
+    return match.latitude, match.longitude, match.precision
+
+
+def test_resolve_matches_lookup(raw_catalog):
+    gazetteer = get_gazetteer()
+    destinations = pd.concat([raw_catalog['destination'], pd.Series(
+        ['Pariss', 'Lyon', 'Saint Johns', None, 'Tokyo', 'Xq', 'São Paulo']
+    )], ignore_index=True)
+    countries = pd.concat([raw_catalog['country'], pd.Series(
+        ['France', 'France', 'Antigua', 'France', None, 'Japan', 'Atlantis']
+    )], ignore_index=True)
+
+    latitudes, longitudes, precisions = gazetteer.resolve(destinations, countries)
+
+    for destination, country, latitude, longitude, precision in zip(destinations, countries, latitudes,
+                                                                      longitudes, precisions):
+        if pd.isna(destination) or pd.isna(country):
+            expected = (np.nan, np.nan, 'none')
+        else:
+            expected = expected_match(gazetteer, destination, country)
+        assert precision == expected[2], (destination, country)
+        np.testing.assert_equal((latitude, longitude), expected[:2])
+
+
+def test_catalog_resolves_to_cities(raw_catalog):
+    _, _, precisions = get_gazetteer().resolve(raw_catalog['destination'], raw_catalog['country'])
+    assert set(precisions) == {'city'}
+
+
+def test_country_matches_have_no_coordinates():
+    latitudes, longitudes, precisions = get_gazetteer().resolve(pd.Series(['Lyon']), pd.Series(['France']))
+
+    assert precisions[0] == 'country'
+    assert np.isnan(latitudes[0]) and np.isnan(longitudes[0])
+
+
+def test_fuzzy_matching_can_be_switched_off():
+    destinations, countries = pd.Series(['Pariss', 'Paris', 'Lyon']), pd.Series(['France'] * 3)
+    gazetteer = get_gazetteer()
+
+    _, _, precisions = gazetteer.resolve(destinations, countries)
+    latitudes, _, exact_only = gazetteer.resolve(destinations, countries, fuzzy=False)
+
+    assert list(precisions) == ['fuzzy', 'city', 'country']
+    assert list(exact_only) == ['country', 'city', 'country']
+    assert np.isnan(latitudes[0]) and not np.isnan(latitudes[1])
+
+
+def test_fuzzy_setting_keys_the_snapshot(monkeypatch):
+    monkeypatch.setenv('TRIPX_GEO_FUZZY', '0')
+
+    assert TripXPreprocessor().fuzzy_geocoding is False
+    assert TripXPreprocessor(fuzzy_geocoding=True).config_state() != TripXPreprocessor().config_state()
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import HTTPConnectionPool, iterate_sync, run_sync
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_sequential_requests_reuse_one_connection(server_url):
+    pool = HTTPConnectionPool()
+
+    async def fetch_all():
+        for _ in range(5):
+            response = await pool.client().get(server_url)
+            assert response.text == 'ok'
+
+    run_sync(fetch_all(), timeout=10)
+
+    stats = pool.connection_stats()['127.0.0.1']
+    assert stats['requests'] == 5
+    assert stats['new_connections'] == 1
+    assert stats['reused_connections'] == 4
+    assert stats['reuse_rate'] == 0.8
+
+
+def test_each_event_loop_gets_its_own_client():
+    pool = HTTPConnectionPool()
+
+    async def client():
+        return pool.client()
+
+    assert run_sync(client()) is run_sync(client())
+    assert asyncio.run(client()) is not run_sync(client())
+
+
+def test_iterate_sync_yields_items_and_raises_errors():
+    async def numbers():
+        for i in range(3):
+            yield i
+        raise ValueError('upstream failed')
+
+    items = []
+    with pytest.raises(ValueError):
+        for item in iterate_sync(numbers()):
+            items.append(item)
+
+    assert items == [0, 1, 2]
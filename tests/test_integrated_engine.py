@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from conftest import DATA_PATH
+from integrated_engine import TripXIntegratedEngine
+
+
+PREFERENCES = {'budget': 100, 'duration': 5, 'trip_type': 'culture', 'season': 'spring'}
+
+
+@pytest.fixture(scope='module')
+def integrated_engine():
+    return TripXIntegratedEngine('mock', data_path=DATA_PATH)
+
+
+def test_streamed_itineraries_match_results(integrated_engine):
+    request = integrated_engine.start_enhanced_recommendations(PREFERENCES, top_n=3, stream_itineraries=True)
+
+    events = list(request.updates(timeout=30))
+    stages = [event for event in events if event['stage'] != 'itinerary_chunk']
+    chunks = [event for event in events if event['stage'] == 'itinerary_chunk']
+
+    assert len(stages) == request.total_stages
+    assert {event['rank'] for event in chunks} == {1, 2, 3}
+
+    for recommendation in request.result(timeout=30)['recommendations']:
+        assert recommendation['enhancement_status'] == 'success'
+        assert recommendation['detailed_itinerary'] == request.partial_itinerary(recommendation['rank'])
+
+
+def test_comparison_reuses_a_larger_request(integrated_engine):
+    preferences = dict(PREFERENCES, trip_type='beach')
+    request = integrated_engine.start_enhanced_recommendations(preferences, top_n=5)
+    request.result(timeout=30)
+
+    mock = integrated_engine.itinerary_generator.llm_engine.mock_provider
+    calls_before = mock.stats()['calls']
+    report = integrated_engine.generate_comparison_report(preferences)
+
+    assert report['status'] == 'success'
+    assert report['top_destinations'] == [rec['destination'] for rec in request.ml_recommendations[:3]]
+    # Only the comparison itself reaches the provider
+    assert mock.stats()['calls'] - calls_before == 1
+
+
+def test_failed_stage_cancels_its_siblings(integrated_engine, monkeypatch):
+    generator = integrated_engine.itinerary_generator
+    cancelled = []
+
+    async def failing_weather(destination):
+        raise RuntimeError('weather is down')
+
+    async def slow_explanation(user_prefs, destination):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(destination['destination'])
+            raise
+
+    monkeypatch.setattr(generator, '_aget_destination_weather', failing_weather)
+    monkeypatch.setattr(generator, '_agenerate_explanation_text', slow_explanation)
+
+    request = integrated_engine.start_enhanced_recommendations(dict(PREFERENCES, season='winter'), top_n=2)
+    events = list(request.stage_events(timeout=5))
+
+    assert len(cancelled) == 2
+    assert len(events) == request.total_stages == 9
+    assert len({(event['rank'], event['stage']) for event in events}) == 9
+    assert request.progress() == 1.0
+    assert all(isinstance(future.exception(timeout=5), RuntimeError) for future in request.futures)
+    # Late reports from the cancelled stages are ignored
+    time.sleep(0.1)
+    assert request.completed_stages == 9
+
+
+def test_reload_if_changed_swaps_in_the_new_catalog(tmp_path, raw_catalog):
+    data_path = tmp_path / 'dest.csv'
+    raw_catalog.to_csv(data_path, index=False)
+    engine = TripXIntegratedEngine('mock', data_path=str(data_path))
+    old_ml_engine = engine.ml_engine
+
+    assert engine.reload_if_changed() is False
+
+    raw_catalog.iloc[:10].to_csv(data_path, index=False)
+    os.utime(data_path, (engine.data_mtime + 10, engine.data_mtime + 10))
+
+    assert engine.reload_if_changed() is True
+    assert len(engine.destinations_df) == 10
+    assert engine.ml_engine is not old_ml_engine
+    assert engine.reload_if_changed() is False
+
+
+def test_failed_reload_keeps_the_current_catalog(tmp_path, raw_catalog):
+    data_path = tmp_path / 'dest.csv'
+    raw_catalog.to_csv(data_path, index=False)
+    engine = TripXIntegratedEngine('mock', data_path=str(data_path))
+
+    data_path.write_text('destination,country\nHalf-written')
+    os.utime(data_path, (engine.data_mtime + 10, engine.data_mtime + 10))
+
+    assert engine.reload_if_changed() is False
+    assert len(engine.destinations_df) == len(raw_catalog)
@@ -0,0 +1,102 @@
+import asyncio
+
+from http_client import run_sync
+from llm_engine import FreeLLMEngine, TravelItineraryGenerator, split_sections
+from mock_provider import MockProvider
+
+
+def mock_provider(latency: float = 0) -> MockProvider:
+    return MockProvider(latency='constant', latency_median=latency, latency_p95=latency, tokens_per_second=100000)
+
+
+def mock_engine(latency: float = 0, **settings) -> FreeLLMEngine:
+    return FreeLLMEngine('mock', mock_provider=mock_provider(latency), **settings)
+
+
+def destination(name: str, country: str) -> dict:
+    return {'destination': name, 'country': country, 'cost_per_day': 90, 'trip_type': 'culture',
+            'best_season': 'spring', 'overall_score': 0.8}
+
+
+PREFERENCES = {'budget': 100, 'duration': 3, 'trip_type': 'culture', 'season': 'spring'}
+
+
+def test_stream_joins_to_the_generated_text():
+    engine = mock_engine(use_cache=False)
+    prompt = "Create a 2-day travel itinerary for Kyoto, Japan."
+
+    chunks = list(engine.stream_text(prompt, 300))
+
+    assert len(chunks) > 1
+    assert ''.join(chunks) == engine.generate_text(prompt, 300)
+
+
+def test_streamed_text_is_cached():
+    engine = mock_engine()
+    prompt = "Create a 4-day travel itinerary for Lisbon, Portugal, streamed once."
+
+    streamed = ''.join(engine.stream_text(prompt, 300))
+    calls = engine.mock_provider.stats()['calls']
+
+    assert list(engine.stream_text(prompt, 300)) == [streamed]
+    assert engine.generate_text(prompt, 300) == streamed
+    assert engine.mock_provider.stats()['calls'] == calls
+
+
+def test_concurrent_identical_prompts_share_one_call():
+    engine = mock_engine(latency=0.05, use_cache=False)
+    prompt = "Create a 3-day travel itinerary for Porto, Portugal, asked five times at once."
+
+    async def generate_all():
+        return await asyncio.gather(*(engine.agenerate_text(prompt, 200) for _ in range(5)))
+
+    texts = run_sync(generate_all())
+
+    assert len(set(texts)) == 1
+    assert engine.call_stats() == {'provider_calls': 1, 'coalesced_calls': 4}
+    assert engine.mock_provider.stats()['calls'] == 1
+
+
+def test_split_sections_maps_headers_to_destinations():
+    text = ("Here are your trips.\n"
+            "### 2. Rome, Italy\nDay 1: Colosseum\n\n"
+            "### 1. Paris, France\nDay 1: Louvre\n"
+            "### 2. Rome, Italy\nrepeated section\n"
+            "### 5. Oslo, Norway\nnot asked for\n"
+            "### 3. Lima, Peru\n")
+
+    assert split_sections(text, 3) == ['Day 1: Louvre', 'Day 1: Colosseum', None]
+    assert split_sections('', 2) == [None, None]
+
+
+def test_batched_generation_answers_each_destination():
+    generator = TravelItineraryGenerator('mock', mock_provider=mock_provider())
+    generator.llm_engine.response_cache = None
+    destinations = [destination('Seville', 'Spain'), destination('Krakow', 'Poland'), destination('Hanoi', 'Vietnam')]
+
+    texts = run_sync(generator._agenerate_explanation_texts(PREFERENCES, destinations))
+
+    assert len(texts) == 3 and all(texts)
+    assert not any('###' in text for text in texts)
+    assert generator.llm_engine.call_stats()['provider_calls'] == 1
+
+
+def test_missing_batched_section_is_generated_alone():
+    generator = TravelItineraryGenerator('mock', mock_provider=mock_provider())
+    engine = generator.llm_engine
+    engine.response_cache = None
+    destinations = [destination('Valencia', 'Spain'), destination('Gdansk', 'Poland')]
+    generate = engine.agenerate_text
+
+    async def drop_second_section(prompt, max_tokens=500):
+        text = await generate(prompt, max_tokens)
+        return text.split('### 2.')[0] if '### 2.' in prompt else text
+
+    engine.agenerate_text = drop_second_section
+
+    texts = run_sync(generator._agenerate_explanation_texts(PREFERENCES, destinations))
+
+    alone = run_sync(generate(generator._explanation_prompt(PREFERENCES, destinations[1]), 200))
+    assert texts[1] == alone
+    assert texts[0] and '###' not in texts[0]
+    assert engine.call_stats()['provider_calls'] == 3
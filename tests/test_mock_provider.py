@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from mock_provider import MockProvider, MockProviderError
+
+
+def instant_provider(**settings) -> MockProvider:
+    return MockProvider(latency='constant', latency_median=0, latency_p95=0, tokens_per_second=100000, **settings)
+
+
+def test_same_seed_same_output():
+    prompt = "Create a 3-day travel itinerary for Paris, France."
+
+    assert instant_provider(seed=1).generate_text(prompt) == instant_provider(seed=1).generate_text(prompt)
+    assert instant_provider(seed=1).generate_text(prompt) != instant_provider(seed=2).generate_text(prompt)
+
+
+def test_small_radius_attractions():
+    provider = instant_provider()
+
+    for radius in (0, 1, 50, 100, 5000):
+        attractions = asyncio.run(provider.aattractions(48.86, 2.35, radius))
+        assert all(0 <= attraction['distance'] < max(radius, 1) for attraction in attractions)
+
+
+def test_attempt_tracking_is_bounded():
+    provider = instant_provider(max_tracked_requests=10)
+
+    for i in range(100):
+        asyncio.run(provider.aweather(i, i))
+
+    assert len(provider._attempts) == 10
+
+
+def test_error_rate_one_always_fails():
+    provider = instant_provider(error_rate=1.0)
+
+    with pytest.raises(MockProviderError):
+        asyncio.run(provider.aweather(0, 0))
+    assert provider.stats()['errors'] == 1
@@ -0,0 +1,79 @@
+import random
+
+import numpy as np
+
+from conftest import build_engine
+
+
+TRIP_TYPES = ['beach', 'culture', 'urban', 'luxury', 'nature', 'adventure']
+SEASONS = ['spring', 'summer', 'fall', 'winter', 'dry_season', 'cool_season', 'monsoon']
+
+
+def random_profiles(engine, count, seed=0):
+    rng = random.Random(seed)
+    return [
+        (engine.preprocessor.create_user_profile_features(
+            budget=rng.choice([rng.randint(10, 400), rng.uniform(10, 400)]),
+            duration=rng.randint(1, 30),
+            trip_type=rng.choice(TRIP_TYPES),
+            season=rng.choice(SEASONS)
+        ), rng.choice([1, 3, 5, 10, 50, 500]))
+        for _ in range(count)
+    ]
+
+
+def test_vectorized_matches_reference(engine):
+    for profile, top_n in random_profiles(engine, 400):
+        assert engine.get_recommendations(profile, top_n) == engine.get_recommendations_reference(profile, top_n)
+
+
+
+def test_batch_matches_single(engine):
+    cases = random_profiles(engine, 100, seed=1)
+    profiles = [profile for profile, _ in cases]
+
+    for top_n in (1, 5, 50):
+        batch = engine.get_recommendations_batch(profiles, top_n=top_n, chunk_size=7)
+        assert batch == [engine.get_recommendations(profile, top_n) for profile in profiles]
+
+
+def test_cached_results_are_copies(engine):
+    profile = engine.preprocessor.create_user_profile_features(100, 7, 'culture', 'spring')
+    first = engine.get_recommendations(profile, 3)
+    first[0]['destination'] = 'Changed'
+
+    assert engine.get_recommendations(profile, 3)[0]['destination'] != 'Changed'
+
+
+def test_cache_tells_int_and_float_profiles_apart(engine):
+    whole = engine.preprocessor.create_user_profile_features(100, 7, 'culture', 'spring')
+    fractional = engine.preprocessor.create_user_profile_features(100.0, 7.0, 'culture', 'spring')
+
+    engine.get_recommendations(whole, 5)
+
+    assert engine.get_recommendations(fractional, 5) == engine.get_recommendations_reference(fractional, 5)
+    assert engine.get_recommendations(fractional, 5) != engine.get_recommendations(whole, 5)
+
+
+def test_missing_categories_score_the_default(raw_catalog):
+    raw_catalog.loc[1, 'season_best'] = np.nan
+    raw_catalog.loc[5, 'trip_type'] = np.nan
+    engine = build_engine(raw_catalog)
+
+    assert engine.store.vocabularies['season_best'][-1] is None
+    assert engine.store.vocabularies['trip_type'][-1] is None
+
+    for profile, top_n in random_profiles(engine, 60, seed=2):
+        vectorized = engine.get_recommendations(profile, 500)
+        reference = engine.get_recommendations_reference(profile, 500)
+        assert [(r['destination'], r['overall_score']) for r in vectorized] == \
+               [(r['destination'], r['overall_score']) for r in reference]
+
+
+def test_store_rows_match_catalog(engine):
+    store = engine.store
+    assert len(store) == len(engine.df)
+
+    for position in (0, len(store) // 2, len(store) - 1):
+        row = engine.df.iloc[position]
+        assert store.row(position) == {name: row[name] for name in store.row(position)}
@@ -0,0 +1,133 @@
+import time
+
+from llm_engine import FreeLLMEngine
+from mock_provider import MockProvider
+from resilience import CircuitBreaker, ProviderHealth
+
+
+ITINERARY = "Create a 7-day travel itinerary for {}."
+
+
+def mock_engine(latency: float = 0, error_rate: float = 0.0, tokens_per_second: float = 100000,
+                hedge_latency: float = None, **health_settings) -> FreeLLMEngine:
+    """Engine on its own mock and its own health record, so breaker state never leaks between tests."""
+    def mock(seconds, errors=0.0):
+        return MockProvider(latency='constant', latency_median=seconds, latency_p95=seconds, error_rate=errors,
+                            tokens_per_second=tokens_per_second)
+
+    engine = FreeLLMEngine('mock', use_cache=False, mock_provider=mock(latency, error_rate), hedge_delay=0.05)
+    engine.health = ProviderHealth(**health_settings)
+
+    if hedge_latency is not None:
+        engine.hedge_engine = FreeLLMEngine('mock', use_cache=False, hedge_provider='',
+                                            mock_provider=mock(hedge_latency))
+        engine.hedge_engine.health = ProviderHealth()
+    return engine
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_time=0.05)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == 'half_open'
+    assert not breaker.allow()
+
+    # A failed probe reopens the circuit, a successful one closes it
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_failures_are_not_latency_samples():
+    health = ProviderHealth(min_samples=3, min_timeout=0.1)
+    for _ in range(3):
+        health.record_success(0.2)
+    for _ in range(3):
+        health.record_failure()
+
+    assert health.latency.percentile(95) == 0.2
+    assert abs(health.timeout() - 0.6) < 1e-9
+
+
+def test_open_circuit_skips_the_provider():
+    engine = mock_engine(failure_threshold=1)
+    engine.health.record_failure()
+
+    text = engine.generate_text(ITINERARY.format('Bergen, Norway, while open'))
+    streamed = ''.join(engine.stream_text(ITINERARY.format('Bergen, Norway, streamed while open')))
+
+    assert text.startswith('LLM generation failed') and streamed.startswith('LLM generation failed')
+    assert engine.mock_provider.stats()['calls'] == 0
+    assert engine.health.rejected == 2
+
+
+def test_stream_without_a_first_chunk_hits_its_deadline():
+    engine = mock_engine(latency=2.0, max_timeout=0.1)
+
+    started = time.monotonic()
+    text = ''.join(engine.stream_text(ITINERARY.format('Tromso, Norway')))
+
+    assert time.monotonic() - started < 1.0
+    assert text.startswith('LLM generation failed')
+    assert engine.health.failures == 1 and len(engine.health.latency) == 0
+
+
+def test_slow_stream_is_cut_at_the_call_deadline():
+    engine = mock_engine(tokens_per_second=50, max_timeout=0.3)
+    prompt = ITINERARY.format('Lofoten, Norway')
+
+    started = time.monotonic()
+    text = ''.join(engine.stream_text(prompt))
+
+    assert time.monotonic() - started < 1.0
+    assert text and engine.mock_provider.generate_text(prompt, 500).startswith(text)
+    assert len(text) < len(engine.mock_provider.generate_text(prompt, 500))
+    assert engine.health.failures == 1
+
+
+def test_slow_stream_is_hedged():
+    engine = mock_engine(latency=2.0, hedge_latency=0)
+    prompt = ITINERARY.format('Bruges, Belgium')
+
+    started = time.monotonic()
+    text = ''.join(engine.stream_text(prompt))
+
+    assert time.monotonic() - started < 1.0
+    assert text == engine.hedge_engine.mock_provider.generate_text(prompt, 500)
+    # The primary lost the race: neither a failure nor a latency sample
+    assert engine.health.failures == 0 and len(engine.health.latency) == 0
+    assert engine.health.breaker.state == 'closed'
+    assert engine.hedge_engine.health.successes == 1
+
+
+def test_stream_failing_before_its_first_chunk_falls_back_to_the_hedge():
+    engine = mock_engine(error_rate=1.0, hedge_latency=0)
+    engine.hedge_delay = 5.0
+    prompt = ITINERARY.format('Ghent, Belgium')
+
+    started = time.monotonic()
+    text = ''.join(engine.stream_text(prompt))
+
+    assert time.monotonic() - started < 1.0
+    assert text == engine.hedge_engine.mock_provider.generate_text(prompt, 500)
+    assert engine.health.failures == 1
+
+
+def test_slow_call_is_hedged():
+    engine = mock_engine(latency=2.0, hedge_latency=0)
+    prompt = ITINERARY.format('Antwerp, Belgium')
+
+    started = time.monotonic()
+    text = engine.generate_text(prompt)
+
+    assert time.monotonic() - started < 1.0
+    assert text == engine.hedge_engine.mock_provider.generate_text(prompt, 500)
+    assert engine.health.failures == 0
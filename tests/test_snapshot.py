@@ -0,0 +1,119 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from conftest import DATA_PATH
+from prep import TripXPreprocessor, ingest_catalog, load_and_preprocess_data
+from snapshot import (current_snapshot_dir, load_catalog_snapshot, read_manifest, snapshot_is_current, snapshot_key,
+                      snapshot_path, write_catalog_snapshot)
+
+
+def test_snapshot_matches_in_memory(tmp_path):
+    expected, _ = load_and_preprocess_data(DATA_PATH)
+
+    written, _ = load_and_preprocess_data(DATA_PATH, snapshot_dir=str(tmp_path))
+    loaded, preprocessor = load_and_preprocess_data(DATA_PATH, snapshot_dir=str(tmp_path))
+
+    pd.testing.assert_frame_equal(written, expected)
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+    assert len(preprocessor.destination_store) == len(expected)
+
+
+def test_readers_always_find_a_snapshot_while_publishing(tmp_path):
+    path = str(tmp_path / 'catalog')
+    frame = pd.DataFrame({'destination': ['Paris', 'Rome'], 'avg_cost_per_day': [120, 90]})
+    write_catalog_snapshot(frame, path, 'key-0', 2)
+
+    publishing = threading.Event()
+    missing = []
+
+    def read_while_publishing():
+        while not publishing.is_set():
+            directory = current_snapshot_dir(path)
+            # A version can only disappear once two newer ones have been published
+            if directory is None or (read_manifest(directory) is None and current_snapshot_dir(path) == directory):
+                missing.append(directory)
+
+    reader = threading.Thread(target=read_while_publishing)
+    reader.start()
+    try:
+        for i in range(50):
+            write_catalog_snapshot(frame, path, f'key-{i % 2}', 2)
+    finally:
+        publishing.set()
+        reader.join()
+
+    assert not missing
+    pd.testing.assert_frame_equal(load_catalog_snapshot(path, 'key-1'), frame, check_dtype=False)
+
+
+def test_replaced_version_stays_readable(tmp_path):
+    path = str(tmp_path / 'catalog')
+    first = pd.DataFrame({'destination': ['Paris'], 'avg_cost_per_day': [120]})
+    write_catalog_snapshot(first, path, 'first', 2)
+    resolved = current_snapshot_dir(path)
+
+    write_catalog_snapshot(first.assign(avg_cost_per_day=80), path, 'second', 2)
+
+    # A reader that resolved the first version just before the swap can still open it
+    assert read_manifest(resolved)['key'] == 'first'
+    assert current_snapshot_dir(path) != resolved
+
+    write_catalog_snapshot(first, path, 'third', 2)
+    assert not os.path.exists(resolved)
+    # The live version and the one it replaced
+    names = sorted(os.listdir(path))
+    assert names[0] == 'CURRENT' and len(names) == 3 and all(name.startswith('v-') for name in names[1:])
+
+
+def test_unversioned_snapshot_is_rebuilt(tmp_path):
+    expected, _ = load_and_preprocess_data(DATA_PATH)
+    path = tmp_path / 'dest'
+    path.mkdir()
+    (path / 'manifest.json').write_text('{}')
+    (path / '0.npy').write_bytes(b'')
+
+    loaded, _ = load_and_preprocess_data(DATA_PATH, snapshot_dir=str(tmp_path))
+
+    pd.testing.assert_frame_equal(loaded, expected)
+    assert not (path / 'manifest.json').exists()
+    assert current_snapshot_dir(str(path)) is not None
+
+
+def test_chunked_ingestion_matches_in_memory(tmp_path):
+    expected, expected_preprocessor = load_and_preprocess_data(DATA_PATH)
+
+    path = ingest_catalog(DATA_PATH, str(tmp_path), chunksize=50)
+    key = snapshot_key(DATA_PATH, expected_preprocessor.config_state())
+    assert path == snapshot_path(str(tmp_path), DATA_PATH)
+    assert snapshot_is_current(path, key)
+
+    streamed, preprocessor = load_and_preprocess_data(DATA_PATH, snapshot_dir=str(tmp_path), chunksize=50)
+
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False)
+    assert preprocessor.norm_stats == expected_preprocessor.norm_stats
+
+
+def test_chunks_are_geocoded_once(tmp_path, raw_catalog, monkeypatch):
+    preprocessor = TripXPreprocessor()
+    resolve = preprocessor.gazetteer.resolve
+    geocoded_rows = []
+
+    def counting_resolve(destinations, countries, **options):
+        geocoded_rows.append(len(destinations))
+        return resolve(destinations, countries, **options)
+
+    monkeypatch.setattr(preprocessor.gazetteer, 'resolve', counting_resolve)
+    path = str(tmp_path / 'dest')
+    preprocessor.preprocess_to_snapshot(DATA_PATH, path, 'key', chunksize=50)
+
+    # Only the second pass geocodes
+    assert sum(geocoded_rows) == len(raw_catalog)
+    assert snapshot_is_current(path, 'key')
+
+
+def test_chunksize_requires_snapshot_dir():
+    with pytest.raises(ValueError):
+        load_and_preprocess_data(DATA_PATH, chunksize=50)
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from conftest import build_engine
+from test_recsys import random_profiles
+
+
+def assert_same_catalog(engine, raw_df):
+    rebuilt = build_engine(raw_df.reset_index(drop=True))
+
+    pd.testing.assert_frame_equal(engine.df, rebuilt.df, check_dtype=False)
+    for profile, top_n in random_profiles(engine, 50, seed=3):
+        assert engine.get_recommendations(profile, top_n) == rebuilt.get_recommendations(profile, top_n)
+
+
+def test_upsert_matches_full_rebuild(raw_catalog):
+    engine = build_engine(raw_catalog.iloc[:-20].reset_index(drop=True))
+
+    updated = raw_catalog.copy()
+    updated.loc[3, 'avg_cost_per_day'] = 45
+    updated.loc[10, 'popularity_score'] = 9.9
+    # A new maximum moves the bounds, so the whole cost column is renormalized
+    updated.loc[42, 'avg_cost_per_day'] = 5000
+
+    changes = [
+        {'destination': updated.loc[3, 'destination'], 'country': updated.loc[3, 'country'], 'avg_cost_per_day': 45},
+        {'destination': updated.loc[10, 'destination'], 'country': updated.loc[10, 'country'], 'popularity_score': 9.9},
+        {'destination': updated.loc[42, 'destination'], 'country': updated.loc[42, 'country'], 'avg_cost_per_day': 5000},
+    ] + updated.iloc[-20:].to_dict('records')
+
+    result = engine.upsert_destinations(changes)
+
+    assert result['updated'] == 3
+    assert result['inserted'] == 20
+    assert 'avg_cost_per_day' in result['renormalized']
+    assert_same_catalog(engine, updated)
+
+
+def test_delete_matches_full_rebuild(raw_catalog):
+    engine = build_engine(raw_catalog)
+    removed = [5, 17, 200]
+
+    result = engine.delete_destinations(
+        [tuple(raw_catalog.loc[i, ['destination', 'country']]) for i in removed] + [('Nowhere', 'Atlantis')]
+    )
+
+    assert result['deleted'] == len(removed)
+    assert_same_catalog(engine, raw_catalog.drop(index=removed))
+
+
+def test_update_reuses_unchanged_store_parts(engine, raw_catalog):
+    store, live_df = engine.store, engine.df
+    live_copy = live_df.copy()
+    key = tuple(raw_catalog.loc[7, ['destination', 'country']])
+
+    engine.upsert_destinations([{'destination': key[0], 'country': key[1], 'popularity_score': 7.7}])
+
+    assert engine.store.key_positions is store.key_positions
+    assert engine.store.index.cost_order is store.index.cost_order
+    assert engine.store['destination'] is store['destination']
+    assert engine.store['popularity_score'][7] == 7.7
+    # The frame readers already hold is never written in place
+    pd.testing.assert_frame_equal(live_df, live_copy)
+
+    store = engine.store
+    engine.upsert_destinations([{'destination': key[0], 'country': key[1], 'avg_cost_per_day': 999}])
+
+    assert engine.store.index.cost_order is not store.index.cost_order
+    assert engine.store.index.interval_members is store.index.interval_members
+    assert_same_catalog(engine, raw_catalog.assign(
+        popularity_score=raw_catalog['popularity_score'].where(raw_catalog.index != 7, 7.7),
+        avg_cost_per_day=raw_catalog['avg_cost_per_day'].where(raw_catalog.index != 7, 999)
+    ))
+
+
+def test_duplicate_keys_are_rejected_at_load(raw_catalog):
+    duplicated = pd.concat([raw_catalog, raw_catalog.iloc[[4]]], ignore_index=True)
+
+    with pytest.raises(ValueError, match='duplicate'):
+        build_engine(duplicated)